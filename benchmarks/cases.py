@@ -0,0 +1,308 @@
+import math
+import os
+import random
+import tempfile
+
+import pygame
+
+from scripts.entities import PhysicsEntity, Player
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
+from scripts.clouds import Clouds
+from scripts.parallax import Parallax
+from scripts.tilemap import Tilemap, AUTO_TILES
+from scripts import mapformat
+from scripts.inputs import LEFT, RIGHT, JUMP, DASH
+from scripts.replay import Replay
+
+MAPS_PATH = 'data/maps'
+
+CASES = []
+
+
+def case(function):
+    """
+    Registers a benchmark case. A case is a generator that does its setup and then yields (name, run, units, unit) for every variant,
+    where run() is one timed iteration that does `units` pieces of work. A fifth item, setup(), is called untimed before every run().
+    """
+    CASES.append(function)
+    return function
+
+
+def map_ids():
+    return sorted(int(name.split('.')[0]) for name in os.listdir(MAPS_PATH) if name.endswith('.json'))
+
+
+def load_tilemap(game, map_id):
+    tilemap = Tilemap(game)
+    tilemap.load(MAPS_PATH + '/' + str(map_id) + '.json')
+    return tilemap
+
+
+def map_bounds(tilemap):
+    """
+    Returns the (left, top, right, bottom) pixel bounds of a map's grid tiles.
+    """
+    xs = [x for x, y, tile_type, variant in tilemap.tiles()]
+    ys = [y for x, y, tile_type, variant in tilemap.tiles()]
+    return min(xs) * tilemap.tile_size, min(ys) * tilemap.tile_size, (max(xs) + 1) * tilemap.tile_size, (max(ys) + 1) * tilemap.tile_size
+
+
+def scripted_inputs(ticks, seed=0):
+    """
+    A deterministic stand-in for a recorded session: runs left and right for a while at a time, jumping and dashing now and then.
+    """
+    rng = random.Random(seed)
+    inputs = bytearray()
+    direction = 0
+    hold = 0
+    for tick in range(ticks):
+        if not hold:
+            direction = rng.choice([0, LEFT, RIGHT, RIGHT])
+            hold = rng.randint(20, 90)
+        hold -= 1
+
+        bits = direction
+        if rng.random() < 0.03:
+            bits |= JUMP
+        if rng.random() < 0.01:
+            bits |= DASH
+        inputs.append(bits)
+
+    return inputs
+
+
+@case
+def collision(game, options):
+    """
+    PhysicsEntity.update() for N entities falling onto and running along the solid tiles of every map.
+    """
+    ticks = 120
+    for map_id in map_ids():
+        tilemap = load_tilemap(game, map_id)
+        solid = [(x, y) for x, y, tile_type, variant in tilemap.tiles() if tilemap.solid_types[tilemap.tile_type_ids[tile_type]]]
+
+        for count in (16, 64, 256):
+            rng = random.Random(count)
+            starts = []
+            for i in range(count):
+                x, y = rng.choice(solid)
+                starts.append(((x * tilemap.tile_size, (y - 3) * tilemap.tile_size), rng.choice([-1, 1])))
+            entities = [PhysicsEntity(game, 'enemy', pos, (8, 15)) for pos, direction in starts]
+
+            def run(tilemap=tilemap, entities=entities, starts=starts):
+                for entity, (pos, direction) in zip(entities, starts):
+                    entity.pos = list(pos)
+                    entity.velocity = [0, 0]
+                for tick in range(ticks):
+                    for entity, (pos, direction) in zip(entities, starts):
+                        entity.update(tilemap, (direction, 0))
+
+            yield 'collision/map' + str(map_id) + '/' + str(count), run, count * ticks, 'entity updates'
+
+
+@case
+def map_loading(game, options):
+    """
+    Tilemap.load() of every map from the JSON file and from the same map converted to the binary format.
+    """
+    directory = tempfile.mkdtemp()
+    for map_id in map_ids():
+        json_path = MAPS_PATH + '/' + str(map_id) + '.json'
+        binary_path = directory + '/' + str(map_id) + mapformat.EXTENSION
+        mapformat.convert(json_path, binary_path)
+
+        tilemap = Tilemap(game)
+        yield 'maps/map' + str(map_id) + '/json', lambda tilemap=tilemap, path=json_path: tilemap.load(path), 1, 'loads'
+        yield 'maps/map' + str(map_id) + '/binary', lambda tilemap=tilemap, path=binary_path: tilemap.load(path), 1, 'loads'
+
+
+@case
+def autotile(game, options):
+    """
+    A full Tilemap.autotile() pass over every map, and autotiling one tile and its neighbors after an edit like the editor does.
+    """
+    for map_id in map_ids():
+        tilemap = load_tilemap(game, map_id)
+        x, y, tile_type, variant = next(tile for tile in tilemap.tiles() if tile[2] in AUTO_TILES)
+
+        def edit(tilemap=tilemap, x=x, y=y, tile_type=tile_type):
+            tilemap.remove_tile(x, y)
+            tilemap.autotile_tile(x, y)
+            tilemap.set_tile(x, y, tile_type)
+            tilemap.autotile_tile(x, y)
+
+        yield 'autotile/map' + str(map_id) + '/full', tilemap.autotile, sum(chunk.count for chunk in tilemap.chunks.values()), 'tiles'
+        yield 'autotile/map' + str(map_id) + '/edit', edit, 2, 'edits'
+
+
+@case
+def tilemap_render(game, options):
+    """
+    Tilemap.render() at camera positions spread over every map, cold (every chunk has to be baked first) and warm.
+    """
+    surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+    for map_id in map_ids():
+        tilemap = load_tilemap(game, map_id)
+        left, top, right, bottom = map_bounds(tilemap)
+        cameras = [(left + (right - left - 320) * i // 7, top + (bottom - top - 240) * (i % 3) // 2) for i in range(8)]
+
+        def cold(tilemap=tilemap, cameras=cameras):
+            tilemap.invalidate_all()
+            for camera in cameras:
+                tilemap.render(surface, offset=camera)
+
+        def warm(tilemap=tilemap, cameras=cameras):
+            for camera in cameras:
+                tilemap.render(surface, offset=camera)
+
+        tilemap.bake()
+        yield 'tilemap/map' + str(map_id) + '/warm', warm, len(cameras), 'frames'
+        yield 'tilemap/map' + str(map_id) + '/cold', cold, len(cameras), 'frames'
+
+
+@case
+def particles(game, options):
+    """
+    A burst of N particles emitted at once, then updated and drawn for 10 ticks.
+    """
+    surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+    for count in options.scales:
+        system = ParticleSystem(game, capacity=count)
+        rng = random.Random(count)
+        velocities = [[math.cos(angle) * speed, math.sin(angle) * speed] for angle, speed in ((rng.random() * math.pi * 2, rng.random() * 2) for i in range(count))]
+        frames = [rng.randint(0, 7) for i in range(count)]
+
+        def run(system=system, velocities=velocities, frames=frames):
+            system.clear()
+            system.emit_many('particle', (160, 120), velocities, frames)
+            for tick in range(10):
+                system.update()
+                system.render(surface)
+
+        yield 'particles/' + str(count), run, count, 'particles'
+
+
+@case
+def sparks(game, options):
+    """
+    A burst of N sparks, then updated and drawn for 10 ticks.
+    """
+    surface = pygame.Surface((320, 240), pygame.SRCALPHA)
+    for count in options.scales:
+        system = SparkSystem(capacity=count)
+        rng = random.Random(count)
+        angles = [rng.random() * math.pi * 2 for i in range(count)]
+        speeds = [2 + rng.random() for i in range(count)]
+
+        def run(system=system, angles=angles, speeds=speeds):
+            system.clear()
+            system.burst((160, 120), angles, speeds)
+            for tick in range(10):
+                system.update()
+                system.render(surface)
+
+        yield 'sparks/' + str(count), run, count, 'sparks'
+
+
+@case
+def animation(game, options):
+    """
+    Advancing and looking up the image of many playheads of the same clip for 60 ticks, plus switching clips like set_action does.
+    """
+    clips = [game.assets['enemy/idle'], game.assets['enemy/run']]
+    for count in options.scales:
+        playheads = [clips[0].play(i % clips[0].length) for i in range(count)]
+
+        def run(playheads=playheads):
+            for tick in range(60):
+                for playhead in playheads:
+                    playhead.update()
+                    playhead.image(tick & 1)
+
+        def switch(playheads=playheads):
+            for tick in range(60):
+                clip = clips[tick & 1]
+                for playhead in playheads:
+                    playhead.start(clip)
+
+        yield 'animation/' + str(count), run, count * 60, 'updates'
+        yield 'animation/' + str(count) + '/switch', switch, count * 60, 'switches'
+
+
+@case
+def clouds(game, options):
+    """
+    Clouds.update() and render() for 60 frames while the camera pans, drawing every cloud on its own and as pre-composited depth bands.
+    """
+    surface = pygame.Surface((320, 240))
+    for count in (16, 64):
+        layer = Clouds(game.assets['clouds'], count=count, rng=random.Random(count))
+        bands = Parallax(layer.bands(3, surface.get_size()))
+
+        def run(layer=layer):
+            for frame in range(60):
+                layer.update()
+                layer.render(surface, offset=(frame * 3, frame))
+
+        yield 'clouds/' + str(count), run, 60, 'frames'
+        yield 'clouds/' + str(count) + '/bands', lambda layer=bands: run(layer), 60, 'frames'
+
+
+@case
+def present(game, options):
+    """
+    Putting 60 frames on the window: the whole frame scaled (with and without screenshake), and only the cursor moving like in an
+    idle editor.
+    """
+    presenter = game.presenter
+    source = game.display_without_outline
+
+    def full(offset=(0, 0)):
+        for frame in range(60):
+            presenter.present(source, offset)
+
+    def cursor():
+        for frame in range(60):
+            presenter.present(source, dirty=[(frame * 4, 100, 16, 16), (frame * 4 + 4, 100, 16, 16)])
+
+    yield 'present/full', full, 60, 'frames'
+    yield 'present/shake', lambda: full((3, -2)), 60, 'frames'
+    yield 'present/cursor', cursor, 60, 'frames'
+
+
+@case
+def frame(game, options):
+    """
+    The whole game replaying a session from a fixed seed: simulation only, and simulation plus a render per tick.
+    """
+    if options.replay:
+        replay = Replay.load(options.replay)
+        seed, level, inputs = replay.seed, replay.level, replay.inputs
+    else:
+        seed, level, inputs = 0, 0, scripted_inputs(600)
+
+    def reset():
+        # load_level only moves the player, a new one drops the velocity, dash, jumps... the last run left it with
+        game.player = Player(game, (50, 50), (8, 15))
+        game.movement = [False, False]
+        game.pressed = 0
+        game.screenshake = 0
+        game.rng.seed(seed)
+        game.level = level
+        game.load_level(level)
+        # the prefetches load_level starts would otherwise run during the timed run
+        game.levels.wait()
+
+    def simulate():
+        for tick_inputs in inputs:
+            game.step(tick_inputs)
+
+    def simulate_and_render():
+        for tick_inputs in inputs:
+            game.step(tick_inputs)
+            game.render()
+
+    # loading the level (and the collection load_level does) isn't frame cost, it happens untimed before every run
+    yield 'frame/step', simulate, len(inputs), 'ticks', reset
+    yield 'frame/step+render', simulate_and_render, len(inputs), 'ticks', reset
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from scripts.tilemap import Tilemap
+from scripts import mapformat
+from benchmarks.cases import MAPS_PATH, map_ids
+
+
+def load_json(path):
+    f = open(path, 'r')
+    map_data = json.load(f)
+    f.close()
+    return map_data
+
+
+def measure(load, path, repeat=20):
+    """
+    :return: (fastest load in milliseconds, peak Python heap while loading in KB, Python heap kept by the result in KB)
+    """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        load(path)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    result = load(path)
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return min(times), peak / 1024, kept / 1024
+
+
+def load_tilemap(path):
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    return tilemap
+
+
+if __name__ == '__main__':
+    # load time and memory of the JSON maps against the same maps in the binary format, parsing alone and into a Tilemap. Memory is the
+    # Python heap measured with tracemalloc, the memory-mapped file of a binary map is counted by its size on disk instead
+    directory = tempfile.mkdtemp()
+    print('%-6s %-14s %10s %10s %10s %10s' % ('map', 'load', 'file KB', 'ms', 'peak KB', 'kept KB'))
+    for map_id in map_ids():
+        json_path = MAPS_PATH + '/' + str(map_id) + '.json'
+        binary_path = directory + '/' + str(map_id) + mapformat.EXTENSION
+        mapformat.convert(json_path, binary_path)
+
+        for name, load, path in [('json parse', load_json, json_path), ('binary parse', mapformat.open_map, binary_path),
+                                 ('json Tilemap', load_tilemap, json_path), ('binary Tilemap', load_tilemap, binary_path)]:
+            ms, peak, kept = measure(load, path)
+            print('%-6s %-14s %10.1f %10.3f %10.1f %10.1f' % (map_id, name, os.path.getsize(path) / 1024, ms, peak, kept))
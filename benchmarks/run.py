@@ -0,0 +1,139 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# the game loads its data with paths relative to the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pygame
+
+from game import Game
+from benchmarks.cases import CASES
+
+BASELINE_PATH = 'benchmarks/baseline.json'
+
+
+def measure(run, repeat, setup=None):
+    """
+    Times run() after one untimed warm-up call, with the garbage collector paused like timeit does so collections triggered by
+    earlier benchmarks don't land in the timings.
+    :param setup: called before every run() outside the timed region, e.g. to reset state the run changes
+    :return: the time of every repetition in milliseconds
+    """
+    if setup:
+        setup()
+    run()
+
+    gc.collect()
+    gc.disable()
+    times = []
+    for i in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    gc.enable()
+
+    return times
+
+
+def run_cases(game, options):
+    results = {}
+    for case in CASES:
+        for name, run, units, unit, *setup in case(game, options):
+            if options.only and not any(name.startswith(prefix) for prefix in options.only):
+                continue
+
+            times = measure(run, options.repeat, *setup)
+            results[name] = {
+                'median_ms': statistics.median(times),
+                'min_ms': min(times),
+                'per_second': units / (min(times) / 1000),
+                'unit': unit,
+            }
+            print('%-32s %10.3f ms  %14.0f %s/s' % (name, results[name]['median_ms'], results[name]['per_second'], unit))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints how every result moved against the baseline.
+    :return: the names of the benchmarks that got slower by more than the tolerance
+    """
+    regressions = []
+    print()
+    print('%-32s %10s %10s %8s' % ('benchmark', 'baseline', 'now', 'change'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        # the fastest repetition is the least affected by whatever else the machine was doing
+        before = baseline[name]['min_ms']
+        change = result['min_ms'] / before - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-32s %10.3f %10.3f %+7.1f%%%s' % (name, before, result['min_ms'], change * 100, flag))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmarks of the collision, rendering and effects hot paths')
+    parser.add_argument('--only', nargs='*', metavar='PREFIX', help='only run benchmarks whose name starts with one of these, e.g. collision sparks/1000')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repetitions of every benchmark')
+    parser.add_argument('--scales', type=int, nargs='*', default=[1000, 10000, 100000], help='burst sizes for the particle and spark benchmarks')
+    parser.add_argument('--replay', metavar='PATH', help='replay recorded with game.py --record for the full frame benchmark, a scripted session is used otherwise')
+    parser.add_argument('--output', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--baseline', metavar='PATH', default=BASELINE_PATH, help='results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown against the baseline that counts as a regression (0.2 = 20%%)')
+    options = parser.parse_args()
+
+    game = Game(headless=True, seed=0)
+
+    report = {
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'pygame': pygame.version.ver},
+        'results': run_cases(game, options),
+    }
+
+    if options.output:
+        f = open(options.output, 'w')
+        json.dump(report, f, indent=2)
+        f.close()
+
+    if options.save_baseline:
+        # merge so a partial run (--only) only replaces the benchmarks it ran
+        baseline = {}
+        if os.path.exists(options.baseline):
+            f = open(options.baseline, 'r')
+            baseline = json.load(f)['results']
+            f.close()
+        baseline.update(report['results'])
+
+        f = open(options.baseline, 'w')
+        json.dump({'machine': report['machine'], 'results': baseline}, f, indent=2)
+        f.close()
+        print('\nbaseline saved to', options.baseline)
+    elif os.path.exists(options.baseline):
+        f = open(options.baseline, 'r')
+        baseline = json.load(f)
+        f.close()
+
+        if baseline['machine'] != report['machine']:
+            print('\nwarning: the baseline was recorded on', baseline['machine'])
+
+        regressions = compare(report['results'], baseline['results'], options.tolerance)
+        if regressions:
+            print('\n' + str(len(regressions)), 'benchmark(s) regressed by more than', str(round(options.tolerance * 100)) + '%')
+            sys.exit(1)
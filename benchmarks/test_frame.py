@@ -0,0 +1,29 @@
+import argparse
+import os
+import sys
+
+# the game loads its data with paths relative to the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from game import Game
+from benchmarks.cases import frame
+from scripts.replay import state_checksum
+
+
+def test_frame_runs_are_identical():
+    """
+    Every timed repetition of the frame benchmark has to replay exactly the same ticks, so its setup must reset all the state a run
+    leaves behind.
+    """
+    game = Game(headless=True, seed=0)
+    name, run, units, unit, setup = next(frame(game, argparse.Namespace(replay=None)))
+
+    checksums = []
+    for i in range(3):
+        setup()
+        run()
+        checksums.append(state_checksum(game))
+
+    assert checksums[0] == checksums[1] == checksums[2]
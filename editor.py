@@ -2,10 +2,11 @@ import sys
 import pygame
 from pygame.locals import *
 
-from scripts.utils import load_image, load_images
-from scripts.tilemap import Tilemap
+from scripts.assets import AssetBundle
+from scripts.presenter import Presenter
+from scripts.tilemap import Tilemap, AUTO_TILES
 
-RENDER_SCALE = 2.0
+RENDER_SCALE = 2
 
 
 class Editor:
@@ -13,17 +14,19 @@ class Editor:
         pygame.init()
 
         pygame.display.set_caption('Editor')
-        self.screen = pygame.display.set_mode((640, 480))
+        self.presenter = Presenter((320, 240), RENDER_SCALE)
+        self.screen = self.presenter.screen
         self.display = pygame.Surface((320, 240))
 
         self.clock = pygame.time.Clock()
 
+        bundle = AssetBundle()
         self.assets = {
-            'decor': load_images('tiles/decor'),
-            'grass': load_images('tiles/grass'),
-            'large_decor': load_images('tiles/large_decor'),
-            'stone': load_images('tiles/stone'),
-            'spawners': load_images('tiles/spawners'),
+            'decor': bundle.images('tiles/decor'),
+            'grass': bundle.images('tiles/grass'),
+            'large_decor': bundle.images('tiles/large_decor'),
+            'stone': bundle.images('tiles/stone'),
+            'spawners': bundle.images('tiles/spawners'),
         }
 
         self.movement = [False, False, False, False]
@@ -47,49 +50,74 @@ class Editor:
         self.ctrl = False
 
         self.ongrid = True
+        # autotiled tiles get their variant from their neighbors as they are placed and removed, T toggles it
+        self.autotile = True
+
+        # what was on the window last frame, see run()
+        self.redraw = True
+        self.last_scroll = None
+        self.cursor = None
 
     def run(self):
         while True:
-            self.display.fill((0, 0, 0))
-
             self.scroll[0] += (self.movement[1] - self.movement[0]) * 2
             self.scroll[1] += (self.movement[3] - self.movement[2]) * 2
             render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
 
-            self.tilemap.render(self.display, offset=render_scroll)
+            current_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant]
 
-            current_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant].copy()
-            current_tile_img.set_alpha(100)
-
-            mouse_pos = pygame.mouse.get_pos()
-            mouse_pos = (mouse_pos[0] / RENDER_SCALE, mouse_pos[1] / RENDER_SCALE)
+            mouse_pos = self.presenter.to_frame(pygame.mouse.get_pos())
             tile_pos = (int((mouse_pos[0] + self.scroll[0]) // self.tilemap.tile_size), int((mouse_pos[1] + self.scroll[1]) // self.tilemap.tile_size))
-
             if self.ongrid:
-                # Blit the selected image to the tile the mouse is hovering over
-                self.display.blit(current_tile_img, (tile_pos[0] * self.tilemap.tile_size - self.scroll[0], tile_pos[1] * self.tilemap.tile_size - self.scroll[1]))
+                # the selected image goes on the tile the mouse is hovering over
+                cursor = pygame.Rect((tile_pos[0] * self.tilemap.tile_size - self.scroll[0], tile_pos[1] * self.tilemap.tile_size - self.scroll[1]), current_tile_img.get_size())
             else:
-                self.display.blit(current_tile_img, mouse_pos)
+                cursor = pygame.Rect(mouse_pos, current_tile_img.get_size())
 
-            if self.clicking and self.ongrid:
-                self.tilemap.tilemap[str(tile_pos[0]) + ';' + str(tile_pos[1])] = {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': tile_pos}
-            if self.right_clicking:
-                tile_location = str(tile_pos[0]) + ';' + str(tile_pos[1])
+            # while nothing happens the last frame stays on the window, when only the mouse moves just the old and new cursor are redrawn
+            if self.redraw or render_scroll != self.last_scroll:
+                dirty = None
+            elif cursor != self.cursor:
+                dirty = [self.cursor, cursor]
+            else:
+                dirty = []
+            self.redraw = False
+            self.last_scroll = render_scroll
+            self.cursor = cursor
 
-                # Remove the tile if it exists
-                if tile_location in self.tilemap.tilemap:
-                    del self.tilemap.tilemap[tile_location]
+            if dirty != []:
+                self.display.fill((0, 0, 0))
+                self.tilemap.render(self.display, offset=render_scroll)
+
+                preview = current_tile_img.copy()
+                preview.set_alpha(100)
+                self.display.blit(preview, cursor)
+                self.display.blit(preview, (5, 5))
 
-                for tile in self.tilemap.offgrid_tiles.copy():
-                    tile_image = self.assets[tile['type']][tile['variant']]
-                    tile_rect = pygame.Rect(tile['pos'][0] - self.scroll[0], tile['pos'][1] - self.scroll[1], tile_image.get_width(), tile_image.get_height())
+            if self.clicking or self.right_clicking:
+                # the edits show up in the next frame
+                self.redraw = True
 
-                    if tile_rect.collidepoint(mouse_pos):
-                        self.tilemap.offgrid_tiles.remove(tile)
+            if self.clicking and self.ongrid:
+                tile = self.tilemap.get_tile(tile_pos[0], tile_pos[1])
+                # with autotiling an autotiled tile that is already there keeps its variant instead of flipping back to the selected one
+                # every frame
+                if not self.autotile or not tile or tile[0] not in AUTO_TILES or tile[0] != self.tile_list[self.tile_group]:
+                    self.tilemap.set_tile(tile_pos[0], tile_pos[1], self.tile_list[self.tile_group], self.tile_variant)
+                    if self.autotile:
+                        self.tilemap.autotile_tile(tile_pos[0], tile_pos[1])
+            if self.right_clicking:
+                # Remove the tile if it exists
+                if self.tilemap.remove_tile(tile_pos[0], tile_pos[1]) and self.autotile:
+                    self.tilemap.autotile_tile(tile_pos[0], tile_pos[1])
 
-            self.display.blit(current_tile_img, (5, 5))
+                for tile in self.tilemap.offgrid_at((mouse_pos[0] + self.scroll[0], mouse_pos[1] + self.scroll[1])):
+                    self.tilemap.remove_offgrid(tile)
 
             for event in pygame.event.get():
+                # anything but moving the mouse can change the map or the selected tile
+                if event.type != MOUSEMOTION:
+                    self.redraw = True
                 if (event.type == QUIT) or (event.type == KEYUP and event.key == K_ESCAPE):
                     pygame.quit()
                     sys.exit()
@@ -98,7 +126,7 @@ class Editor:
                         self.clicking = True
 
                         if not self.ongrid:
-                            self.tilemap.offgrid_tiles.append({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mouse_pos[0] + self.scroll[0], mouse_pos[1] + self.scroll[1])})
+                            self.tilemap.add_offgrid({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mouse_pos[0] + self.scroll[0], mouse_pos[1] + self.scroll[1])})
                     elif event.button == 3:
                         self.right_clicking = True
 
@@ -135,7 +163,9 @@ class Editor:
                     if event.key == K_g:
                         self.ongrid = not self.ongrid
                     if event.key == K_t:
-                        self.tilemap.autotile()
+                        self.autotile = not self.autotile
+                        if self.autotile:
+                            self.tilemap.autotile()
                     if event.key == K_LSHIFT:
                         self.shift = True
                     if event.key == K_LCTRL:
@@ -154,9 +184,8 @@ class Editor:
                     if event.key == K_LCTRL:
                         self.ctrl = False
 
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-
-            pygame.display.update()
+            self.presenter.present(self.display, dirty=dirty)
+            self.presenter.update()
             self.clock.tick(60)
 
 
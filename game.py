@@ -1,243 +1,500 @@
+import argparse
+import gc
 import math
 import os
-import random
 import sys
 import pygame
 from pygame.locals import *
 
-from scripts.entities import PhysicsEntity, Player, Enemy
-from scripts.spark import Spark
-from scripts.utils import load_image, load_images, Animation
-from scripts.tilemap import Tilemap
-from scripts.clouds import Clouds
-from scripts.particle import Particle
+from scripts.entities import PhysicsEntity, Player, Enemy, Projectile
+from scripts.spark import SparkSystem
+from scripts.utils import AnimationClip, SpriteAtlas, NullSound
+from scripts.assets import AssetBundle, LazySound
+from scripts.levels import LevelLoader
+from scripts.parallax import Parallax, LAYERS_PATH
+from scripts.particle import ParticleSystem
+from scripts.pool import Pool
+from scripts.outline import OutlineRenderer
+from scripts.transitions import TransitionRenderer
+from scripts.presenter import Presenter, PRESENT_MODES
+from scripts.spatial import SpatialGrid
+from scripts.inputs import LEFT, RIGHT, JUMP, DASH, horizontal
+from scripts.rng import RandomStreams, SEED_RANGE
+from scripts.replay import InputRecorder, state_checksum
+from scripts.profiler import FrameProfiler, StageTimer
+from scripts.memory import memory_report, format_report
+
+# 'fast' (default), 'mask' (the original full-screen mask pass) or 'off', see scripts/outline.py
+OUTLINE_MODE = 'fast'
+
+# the game is drawn at RENDER_SIZE and scaled up by a whole number for the window, PRESENT_MODE is 'scale', 'scale2x' or 'sdl', see
+# scripts/presenter.py
+RENDER_SIZE = (320, 240)
+RENDER_SCALE = 2
+PRESENT_MODE = 'scale'
+
+# 'iris' (default), 'fade' or 'wipe', see scripts/transitions.py
+TRANSITION_STYLE = 'iris'
+
+# simulation ticks per second, independent of the frame rate
+TICK_RATE = 60
+# render frame rate cap, 0 for uncapped
+MAX_FPS = 60
+# most ticks simulated before a frame is rendered when the game falls behind
+MAX_CATCHUP_STEPS = 5
+
+# enemies further than this many pixels outside the view sleep (no AI, physics or animation) until the camera comes close again
+ACTIVE_MARGIN = 192
+# tile chunks are baked ahead this many pixels around the view, at most CHUNK_BAKES_PER_FRAME per frame
+STREAM_MARGIN = 128
+CHUNK_BAKES_PER_FRAME = 2
+# enemies are still drawn this far outside the view since their sprite and gun stick out of the hitbox
+RENDER_MARGIN = 32
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, seed=None, record=None, profile=None, scale=RENDER_SCALE, window_size=None, present_mode=PRESENT_MODE):
+        """
+        :param headless: run without a window or sound card (dummy SDL drivers, silent sfx), for bots, replays and tests on CI machines.
+            The simulation is advanced with step() and render() stays optional.
+        :param seed: seed for every random stream, a random seed is picked when not given
+        :param record: path to save a replay of the session's inputs to when the game is quit
+        :param profile: path to dump the frame profiler trace to (.csv or .json) when the game is quit
+        :param scale: whole number the frame is scaled up by, None for the largest that fits in window_size
+        :param window_size: size of the window, the scaled frame is centred in it
+        :param present_mode: how the frame is scaled, see scripts/presenter.py
+        """
+        # time spent in each part of startup, printed with --startup-times
+        self.startup = StageTimer()
+
+        self.headless = headless
+        self.rng = RandomStreams(seed)
+
+        self.record_path = record
+        self.recorder = InputRecorder(self.rng.base_seed) if record else None
+
+        # F3 toggles the timing overlay, F4 dumps the trace to profile_path, F5 prints the memory used by every subsystem
+        self.profiler = FrameProfiler()
+        self.profile_path = profile
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
         pygame.init()
 
         pygame.display.set_caption('Shadow Strike')
-        self.screen = pygame.display.set_mode((640, 480))
-        self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
-        self.display_without_outline = pygame.Surface((320, 240))
+        # the dummy video driver has no renderer for pygame.SCALED
+        self.presenter = Presenter(RENDER_SIZE, scale, window_size, 'scale' if headless else present_mode)
+        self.screen = self.presenter.screen
+        self.display = pygame.Surface(RENDER_SIZE, pygame.SRCALPHA)
+        self.display_without_outline = pygame.Surface(RENDER_SIZE)
+        self.outline = OutlineRenderer(self.display.get_size(), mode=OUTLINE_MODE)
+        self.transitions = TransitionRenderer(self.display.get_size(), style=TRANSITION_STYLE)
+        self.startup.mark('window')
 
         self.clock = pygame.time.Clock()
 
         self.movement = [False, False]
 
-        self.assets = {
-            'decor': load_images('tiles/decor'),
-            'grass': load_images('tiles/grass'),
-            'large_decor': load_images('tiles/large_decor'),
-            'stone': load_images('tiles/stone'),
-            'player': load_image('entities/player.png'),
-            'background': load_image('background.png'),
-            'clouds': load_images('clouds'),
-            'enemy/idle': Animation(load_images('entities/enemy/idle'), image_duration=6),
-            'enemy/run': Animation(load_images('entities/enemy/run'), image_duration=4),
-            'player/idle': Animation(load_images('entities/player/idle'), image_duration=6),
-            'player/run': Animation(load_images('entities/player/run'), image_duration=4),
-            'player/jump': Animation(load_images('entities/player/jump')),
-            'player/slide': Animation(load_images('entities/player/slide')),
-            'player/wall_slide': Animation(load_images('entities/player/wall_slide')),
-            'particles/leaf': Animation(load_images('particles/leaf'), image_duration=20, loop=False),
-            'particles/particle': Animation(load_images('particles/particle'), image_duration=6, loop=False),
-            'gun': load_image('gun.png'),
-            'projectile': load_image('projectile.png'),
-        }
+        # JUMP/DASH presses waiting for the next tick
+        self.pressed = 0
+
+        # every image comes out of one prebuilt atlas file, see scripts/assets.py
+        bundle = AssetBundle()
+        self.startup.mark('bundle')
 
-        self.sfx = {
-            'jump': pygame.mixer.Sound('data/sfx/jump.wav'),
-            'dash': pygame.mixer.Sound('data/sfx/dash.wav'),
-            'hit': pygame.mixer.Sound('data/sfx/hit.wav'),
-            'shoot': pygame.mixer.Sound('data/sfx/shoot.wav'),
-            'ambience': pygame.mixer.Sound('data/sfx/ambience.wav'),
+        self.assets = {
+            'decor': bundle.images('tiles/decor'),
+            'grass': bundle.images('tiles/grass'),
+            'large_decor': bundle.images('tiles/large_decor'),
+            'stone': bundle.images('tiles/stone'),
+            'player': bundle.image('entities/player.png'),
+            'background': bundle.image('background.png'),
+            'clouds': bundle.images('clouds'),
+            'enemy/idle': AnimationClip(bundle.images('entities/enemy/idle'), image_duration=6),
+            'enemy/run': AnimationClip(bundle.images('entities/enemy/run'), image_duration=4),
+            'player/idle': AnimationClip(bundle.images('entities/player/idle'), image_duration=6),
+            'player/run': AnimationClip(bundle.images('entities/player/run'), image_duration=4),
+            'player/jump': AnimationClip(bundle.images('entities/player/jump')),
+            'player/slide': AnimationClip(bundle.images('entities/player/slide')),
+            'player/wall_slide': AnimationClip(bundle.images('entities/player/wall_slide')),
+            'particles/leaf': AnimationClip(bundle.images('particles/leaf'), image_duration=20, loop=False),
+            'particles/particle': AnimationClip(bundle.images('particles/particle'), image_duration=6, loop=False),
+            'gun': SpriteAtlas([bundle.image('gun.png')]),
+            'projectile': bundle.image('projectile.png'),
         }
+        self.startup.mark('images')
+
+        if headless:
+            self.sfx = {name: NullSound() for name in ['jump', 'dash', 'hit', 'shoot', 'ambience']}
+        else:
+            # decoded in the background, a sound that is played before it's ready is loaded right away
+            self.sfx = {
+                'jump': LazySound('data/sfx/jump.wav'),
+                'dash': LazySound('data/sfx/dash.wav'),
+                'hit': LazySound('data/sfx/hit.wav'),
+                'shoot': LazySound('data/sfx/shoot.wav'),
+                'ambience': LazySound('data/sfx/ambience.wav'),
+            }
+            for sound in self.sfx.values():
+                sound.preload()
 
         self.sfx['ambience'].set_volume(0.2)
         self.sfx['shoot'].set_volume(0.4)
         self.sfx['hit'].set_volume(0.8)
         self.sfx['dash'].set_volume(0.3)
         self.sfx['jump'].set_volume(0.7)
+        self.startup.mark('sounds')
 
-        self.clouds = Clouds(self.assets['clouds'], count=16)
+        # the sky and the clouds, see data/parallax.json
+        self.background = Parallax.load(LAYERS_PATH, bundle, self.display.get_size(), rng=self.rng.clouds)
 
         self.player = Player(self, (50, 50), (8, 15))
 
-        self.tilemap = Tilemap(self)
+        # the next level (and a fresh copy of the current one for restarts) is prepared in the background while playing
+        self.levels = LevelLoader(self)
+
+        # effects and projectiles live in fixed-capacity pools that are reused across levels
+        self.projectiles = Pool(Projectile, capacity=128)
+        self.particles = ParticleSystem(self, capacity=16384)
+        self.sparks = SparkSystem(capacity=2048)
+
+        # broad-phase for entity and projectile overlaps, rebuilt every tick
+        self.collision_grid = SpatialGrid(cell_size=32)
 
         self.level = 0
-        self.load_level(self.level)
+        # there is no previous level to collect yet and a full collection of everything imported at startup is slow, freezing is enough
+        self.load_level(self.level, collect=False)
+        self.startup.mark('level')
 
         self.screenshake = 0
 
-    def load_level(self, map_id):
-        self.tilemap.load('data/maps/' + str(map_id) + '.json')
+    def load_level(self, map_id, collect=True):
+        level = self.levels.take(map_id)
+        self.tilemap = level.tilemap
 
-        self.leaf_spawners = []
-        for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
-            self.leaf_spawners.append(pygame.Rect(4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13))
+        self.leaf_spawners = SpatialGrid(cell_size=64)
+        for tree in level.trees:
+            rect = pygame.Rect(4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13)
+            self.leaf_spawners.insert(rect, rect)
 
         self.enemies = []
-        for spawner in self.tilemap.extract([('spawners', 0), ('spawners', 1)]):
+        for spawner in level.spawners:
             if spawner['variant'] == 0:
                 self.player.pos = spawner['pos']
+                self.player.prev_pos = list(spawner['pos'])
                 self.player.air_time = 0
             else:
                 self.enemies.append(Enemy(self, spawner['pos'], (8, 15)))  # 8 by 15 is the dimensions of the image, changes depending on the image
 
-        self.projectiles = []
-        self.particles = []
-        self.sparks = []
+        self.levels.prefetch(map_id)
+        self.levels.prefetch(map_id + 1)
+
+        self.projectiles.clear()
+        self.particles.clear()
+        self.sparks.clear()
 
         self.scroll = [0, 0]
+        self.prev_scroll = [0, 0]
         self.dead = 0
         self.transition = -30
 
+        # collect the previous level's garbage now, while the transition hides the pause, and keep the long-lived level objects out of
+        # future collections. The last level's objects are unfrozen first so the ones that were left behind can be collected.
+        gc.unfreeze()
+        if collect:
+            gc.collect()
+        gc.freeze()
+
+    def read_inputs(self):
+        """
+        Returns this tick's input bitmask from the keyboard state and clears the pending key presses.
+        """
+        inputs = self.pressed
+        if self.movement[0]:
+            inputs |= LEFT
+        if self.movement[1]:
+            inputs |= RIGHT
+
+        self.pressed = 0
+        return inputs
+
+    def step(self, inputs=None):
+        """
+        Advances the simulation by one fixed tick.
+        :param inputs: the tick's input bitmask (see scripts/inputs.py), read from the keyboard when not given
+        """
+        if inputs is None:
+            inputs = self.read_inputs()
+
+        if self.recorder is not None:
+            self.recorder.record(inputs)
+
+        if inputs & JUMP:
+            if self.player.jump():
+                self.sfx['jump'].play()
+        if inputs & DASH:
+            self.player.dash()
+
+        self.prev_scroll = list(self.scroll)
+
+        self.screenshake = max(0, self.screenshake - 1)
+
+        # If all enemies are dead
+        if not len(self.enemies):
+            self.transition += 1
+
+            if self.transition > 30:
+                self.level = min(self.level + 1, self.levels.count - 1)
+                self.load_level(self.level)
+        if self.transition < 0:
+            self.transition += 1
+
+        if self.dead:
+            self.dead += 1
+            if self.dead >= 10:
+                self.transition = min(30, self.transition + 1)
+
+            if self.dead > 40:
+                self.load_level(self.level)
+
+        self.scroll[0] += (self.player.hitbox().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
+        self.scroll[1] += (self.player.hitbox().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
+        render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+
+        # only trees around the view spawn leaves, with extra room above since leaves drift down into view
+        for rect in self.leaf_spawners.query_rect((render_scroll[0] - 32, render_scroll[1] - 128, self.display.get_width() + 64, self.display.get_height() + 160)):
+            # bigger tree spawn more leaves
+            # 1/50000 chance per frame
+            if self.rng.leaves.random() * 49999 < rect.width * rect.height:
+                pos = (rect.x + self.rng.leaves.random() * rect.width, rect.y + self.rng.leaves.random() * rect.height)
+                self.particles.emit('leaf', pos, velocity=[-0.1, 0.3], frame=self.rng.leaves.randint(0, 20))
+
+        self.background.update()
+
+        self.profiler.start('enemies')
+        active_area = pygame.Rect(render_scroll[0] - ACTIVE_MARGIN, render_scroll[1] - ACTIVE_MARGIN, self.display.get_width() + ACTIVE_MARGIN * 2, self.display.get_height() + ACTIVE_MARGIN * 2)
+        awake = [enemy for enemy in self.enemies if active_area.colliderect(enemy.hitbox())]
+        for enemy in awake:
+            enemy.update(self.tilemap, (0, 0))
+
+        # sleeping enemies are far from the player, so only the awake ones can be hit
+        grid = self.collision_grid
+        grid.clear()
+        for enemy in awake:
+            grid.insert(enemy, enemy.hitbox())
+
+        # a dashing player kills every enemy it touches, checked before the player moves this tick
+        if abs(self.player.dashing) >= 50:
+            for enemy in grid.query_rect(self.player.hitbox()):
+                enemy.hit()
+                grid.remove(enemy)
+                self.enemies.remove(enemy)
+        self.profiler.stop('enemies')
+
+        self.profiler.start('player')
+        if not self.dead:
+            self.player.update(self.tilemap, (horizontal(inputs), 0))
+        self.profiler.stop('player')
+
+        self.profiler.start('projectiles')
+        for index, projectile in self.projectiles:
+            projectile.pos[0] += projectile.speed
+            projectile.timer += 1
+
+            # 1x1 at the truncated position, the same test as Rect.collidepoint
+            grid.insert(projectile, (int(projectile.pos[0]), int(projectile.pos[1]), 1, 1))
+
+        # one grid query finds every projectile touching the player
+        hits = {id(item) for item in grid.query_rect(self.player.hitbox()) if isinstance(item, Projectile)}
+
+        for index, projectile in self.projectiles:
+            # check if the projectile has hit a solid tile
+            if self.tilemap.solid_check(projectile.pos):
+                self.projectiles.release(index)
+
+                self.sparks.burst(projectile.pos, [self.rng.effects.random() - 0.5 + (math.pi if projectile.speed > 0 else 0) for i in range(4)], [2 + self.rng.effects.random() for i in range(4)])
+            elif projectile.timer > 360:  # 360 frames = 6 seconds timer
+                self.projectiles.release(index)
+            elif abs(self.player.dashing) < 50:
+                # check if the projectile has hit the player
+                if id(projectile) in hits:
+                    self.projectiles.release(index)
+                    self.dead += 1
+
+                    self.screenshake = max(20, self.screenshake)
+                    self.sfx['hit'].play()
+
+                    angles = [self.rng.effects.random() * math.pi * 2 for i in range(30)]
+                    speeds = [self.rng.effects.random() * 5 for i in range(30)]
+                    self.sparks.burst(self.player.hitbox().center, angles, [2 + self.rng.effects.random() for i in range(30)])
+                    self.particles.emit_many('particle', self.player.hitbox().center, [[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5] for angle, speed in zip(angles, speeds)], [self.rng.effects.randint(0, 7) for i in range(30)])
+
+        self.profiler.stop('projectiles')
+
+        self.profiler.start('effects')
+        self.sparks.update()
+        self.particles.update()
+        self.profiler.stop('effects')
+
+    def counts(self):
+        return {'enemies': len(self.enemies), 'projectiles': len(self.projectiles), 'particles': len(self.particles), 'sparks': len(self.sparks)}
+
+    def render(self, alpha=1.0):
+        """
+        Draws the current state of the simulation.
+        :param alpha: how far the frame is between the previous and the current tick (0-1), used to interpolate the camera and entities
+        """
+        profiler = self.profiler
+
+        profiler.start('background')
+        self.display.fill((0, 0, 0, 0))
+
+        render_scroll = (int(self.prev_scroll[0] + (self.scroll[0] - self.prev_scroll[0]) * alpha), int(self.prev_scroll[1] + (self.scroll[1] - self.prev_scroll[1]) * alpha))
+
+        self.background.render(self.display_without_outline, offset=render_scroll)
+        profiler.stop('background')
+
+        profiler.start('tilemap')
+        # the chunks coming into view are baked a few per frame ahead of time, the ones still missing once visible are baked by render()
+        self.tilemap.stream(pygame.Rect(render_scroll, self.display.get_size()).inflate(STREAM_MARGIN * 2, STREAM_MARGIN * 2), budget=CHUNK_BAKES_PER_FRAME)
+        self.tilemap.render(self.display, offset=render_scroll)
+        profiler.stop('tilemap')
+
+        profiler.start('draw entities')
+        visible_area = pygame.Rect(render_scroll, self.display.get_size()).inflate(RENDER_MARGIN * 2, RENDER_MARGIN * 2)
+        for enemy in self.enemies:
+            if visible_area.colliderect(enemy.hitbox()):
+                enemy.render(self.display, offset=render_scroll, alpha=alpha)
+
+        if not self.dead:
+            self.player.render(self.display, offset=render_scroll, alpha=alpha)
+
+        image = self.assets['projectile']
+        for index, projectile in self.projectiles:
+            if visible_area.collidepoint(projectile.pos):
+                self.display.blit(image, (projectile.pos[0] - image.get_width() / 2 - render_scroll[0], projectile.pos[1] - image.get_height() / 2 - render_scroll[1]))
+
+        profiler.stop('draw entities')
+
+        profiler.start('draw effects')
+        self.sparks.render(self.display, offset=render_scroll)
+        profiler.stop('draw effects')
+
+        profiler.start('outline')
+        self.outline.render(self.display, self.display_without_outline)
+        profiler.stop('outline')
+
+        profiler.start('draw effects')
+        self.particles.render(self.display, offset=render_scroll)
+        profiler.stop('draw effects')
+
+        profiler.start('compose')
+        self.transitions.render(self.display, abs(self.transition))
+
+        self.display_without_outline.blit(self.display, (0, 0))
+        profiler.stop('compose')
+
+        profiler.start('scale')
+        screenshake_offset = (self.rng.screenshake.random() * self.screenshake - self.screenshake / 2, self.rng.screenshake.random() * self.screenshake - self.screenshake / 2)
+        self.presenter.present(self.display_without_outline, screenshake_offset)
+        profiler.stop('scale')
+
+        profiler.render_overlay(self.screen, self.counts())
+
+        profiler.start('display update')
+        self.presenter.update()
+        profiler.stop('display update')
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if (event.type == QUIT) or (event.type == KEYUP and event.key == K_ESCAPE):
+                self.quit()
+            if event.type == KEYDOWN:
+                if event.key == K_F3:
+                    self.profiler.overlay = not self.profiler.overlay
+                if event.key == K_F4:
+                    self.profiler.dump(self.profile_path or 'profile.csv')
+                if event.key == K_F5:
+                    print(format_report(memory_report(self)))
+                if event.key == K_a:
+                    self.movement[0] = True
+                if event.key == K_d:
+                    self.movement[1] = True
+                if event.key == K_w:
+                    self.pressed |= JUMP
+                if event.key == K_SPACE:
+                    self.pressed |= DASH
+
+            if event.type == KEYUP:
+                if event.key == K_a:
+                    self.movement[0] = False
+                if event.key == K_d:
+                    self.movement[1] = False
+
+    def quit(self):
+        if self.recorder is not None:
+            self.recorder.save(self.record_path, checksum=state_checksum(self))
+        if self.profile_path:
+            self.profiler.dump(self.profile_path)
+
+        pygame.quit()
+        sys.exit()
+
     def run(self):
-        pygame.mixer.music.load('data/music.wav')
-        pygame.mixer.music.set_volume(0.5)
-        pygame.mixer.music.play(-1)
+        if not self.headless:
+            pygame.mixer.music.load('data/music.wav')
+            pygame.mixer.music.set_volume(0.5)
+            pygame.mixer.music.play(-1)
 
         self.sfx['ambience'].play(-1)
 
+        # the simulation always advances in fixed ticks of 1 / TICK_RATE seconds, rendering happens as often as MAX_FPS allows and
+        # interpolates between the last two ticks
+        tick_time = 1 / TICK_RATE
+        accumulator = 0
+        self.clock.tick()
+
         while True:
-            self.display.fill((0, 0, 0, 0))
-            self.display_without_outline.blit(self.assets['background'], (0, 0))
-
-            self.screenshake = max(0, self.screenshake - 1)
-
-            # If all enemies are dead
-            if not len(self.enemies):
-                self.transition += 1
-
-                if self.transition > 30:
-                    self.level = min(self.level + 1, len(os.listdir('data/maps')) - 1)
-                    self.load_level(self.level)
-            if self.transition < 0:
-                self.transition += 1
-
-            if self.dead:
-                self.dead += 1
-                if self.dead >= 10:
-                    self.transition = min(30, self.transition + 1)
-
-                if self.dead > 40:
-                    self.load_level(self.level)
-
-            self.scroll[0] += (self.player.hitbox().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
-            self.scroll[1] += (self.player.hitbox().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            for rect in self.leaf_spawners:
-                # bigger tree spawn more leaves
-                # 1/50000 chance per frame
-                if random.random() * 49999 < rect.width * rect.height:
-                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'leaf', pos, velocity=[-0.1, 0.3], frame=random.randint(0, 20)))
-
-            self.clouds.update()
-            self.clouds.render(self.display_without_outline, offset=render_scroll)
-
-            self.tilemap.render(self.display, offset=render_scroll)
-
-            for enemy in self.enemies:
-                kill = enemy.update(self.tilemap, (0, 0))
-                enemy.render(self.display, offset=render_scroll)
-                if kill:
-                    self.enemies.remove(enemy)
-
-            if not self.dead:
-                self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
-                self.player.render(self.display, offset=render_scroll)
-
-            # [[x, y], speed-direction, timer]
-            for projectile in self.projectiles.copy():
-                projectile[0][0] += projectile[1]
-                projectile[2] += 1
-                image = self.assets['projectile']
-                self.display.blit(image, (projectile[0][0] - image.get_width() / 2 - render_scroll[0], projectile[0][1] - image.get_height() / 2 - render_scroll[1]))
-
-                # check if the projectile has hit a solid tile
-                if self.tilemap.solid_check(projectile[0]):
-                    self.projectiles.remove(projectile)
-
-                    for i in range(4):
-                        self.sparks.append(Spark(projectile[0], random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0), 2 + random.random()))
-                elif projectile[2] > 360:  # 360 frames = 6 seconds timer
-                    self.projectiles.remove(projectile)
-                elif abs(self.player.dashing) < 50:
-                    # check if the projectile has hit the player
-                    if self.player.hitbox().collidepoint(projectile[0]):
-                        self.projectiles.remove(projectile)
-                        self.dead += 1
-
-                        self.screenshake = max(20, self.screenshake)
-                        self.sfx['hit'].play()
-
-                        for i in range(30):
-                            angle = random.random() * math.pi * 2
-                            speed = random.random() * 5
-                            self.sparks.append(Spark(self.player.hitbox().center, angle, 2 + random.random()))
-                            self.particles.append(Particle(self, 'particle', self.player.hitbox().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-
-            for spark in self.sparks.copy():
-                kill = spark.update()
-                spark.render(self.display, offset=render_scroll)
-                if kill:
-                    self.sparks.remove(spark)
-
-            display_mask = pygame.mask.from_surface(self.display)
-            display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0))
-
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display_without_outline.blit(display_silhouette, offset)
-
-            for particle in self.particles.copy():
-                kill = particle.update()
-                particle.render(self.display, offset=render_scroll)
-
-                if particle.type == 'leaf':
-                    particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
-                if kill:
-                    self.particles.remove(particle)
-
-            for event in pygame.event.get():
-                if (event.type == QUIT) or (event.type == KEYUP and event.key == K_ESCAPE):
-                    pygame.quit()
-                    sys.exit()
-                if event.type == KEYDOWN:
-                    if event.key == K_a:
-                        self.movement[0] = True
-                    if event.key == K_d:
-                        self.movement[1] = True
-                    if event.key == K_w:
-                        if self.player.jump():
-                            self.sfx['jump'].play()
-                    if event.key == K_SPACE:
-                        self.player.dash()
-
-                if event.type == KEYUP:
-                    if event.key == K_a:
-                        self.movement[0] = False
-                    if event.key == K_d:
-                        self.movement[1] = False
-
-            if self.transition:
-                transition_surface = pygame.Surface(self.display.get_size())
-                pygame.draw.circle(transition_surface, (255, 255, 255), (self.display.get_width() // 2, self.display.get_height() // 2), (30 - abs(self.transition)) * 8)
-                transition_surface.set_colorkey((255, 255, 255))
-                self.display.blit(transition_surface, (0, 0))
-
-            self.display_without_outline.blit(self.display, (0, 0))
-
-            screenshake_offset = (random.random() * self.screenshake - self.screenshake / 2, random.random() * self.screenshake - self.screenshake / 2)
-            self.screen.blit(pygame.transform.scale(self.display_without_outline, self.screen.get_size()), screenshake_offset)
-
-            pygame.display.update()
-            self.clock.tick(60)
+            accumulator += self.clock.tick(MAX_FPS) / 1000
+
+            # the frame is timed from here so the wait in clock.tick doesn't count towards it
+            self.profiler.begin_frame()
+
+            self.profiler.start('events')
+            self.handle_events()
+            self.profiler.stop('events')
+
+            steps = 0
+            while accumulator >= tick_time and steps < MAX_CATCHUP_STEPS:
+                self.step()
+                accumulator -= tick_time
+                steps += 1
+
+            # too far behind to catch up, drop the backlog so the game slows down instead of spiralling
+            if accumulator >= tick_time:
+                accumulator = 0
+
+            self.render(accumulator / tick_time)
+
+            self.profiler.end_frame(self.counts())
 
 
 if __name__ == '__main__':
-    Game().run()
+    parser = argparse.ArgumentParser(description='Shadow Strike')
+    parser.add_argument('--seed', type=int, help='seed for all random streams')
+    parser.add_argument('--record', metavar='PATH', help='save a replay of this session, play it back with replay.py')
+    parser.add_argument('--profile', metavar='PATH', help='dump per-frame phase timings to a .csv or .json file on quit')
+    parser.add_argument('--scale', type=int, default=RENDER_SCALE, help='whole number to scale the ' + 'x'.join(map(str, RENDER_SIZE)) + ' frame up by, 0 to fit the window')
+    parser.add_argument('--window', metavar='WIDTHxHEIGHT', help='window size, the scaled frame is centred in it')
+    parser.add_argument('--present', choices=sorted(PRESENT_MODES), default=PRESENT_MODE, help='how the frame is scaled to the window, see scripts/presenter.py')
+    parser.add_argument('--startup-times', action='store_true', help='print how long each stage of startup took')
+    args = parser.parse_args()
+    if args.seed is not None and not 0 <= args.seed < SEED_RANGE:
+        parser.error('--seed has to be between 0 and ' + str(SEED_RANGE - 1))
+
+    window_size = tuple(int(value) for value in args.window.split('x')) if args.window else None
+    game = Game(seed=args.seed, record=args.record, profile=args.profile, scale=args.scale or None, window_size=window_size, present_mode=args.present)
+    if args.startup_times:
+        print(game.startup.report())
+    game.run()
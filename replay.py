@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import pygame
+
+from game import Game, TICK_RATE
+from scripts.replay import Replay, state_checksum
+
+
+def play(replay, headless=True, render=False, realtime=False):
+    """
+    Re-runs a recorded session tick by tick. Headless replays run as fast as the simulation allows.
+    :return: the game in its final state
+    """
+    game = Game(headless=headless, seed=replay.seed)
+    if replay.level != game.level:
+        game.level = replay.level
+        game.load_level(game.level)
+
+    for inputs in replay:
+        game.step(inputs)
+
+        if render:
+            game.render()
+            pygame.event.pump()
+        if realtime:
+            game.clock.tick(TICK_RATE)
+
+    return game
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play back a session recorded with game.py --record')
+    parser.add_argument('path')
+    parser.add_argument('--render', action='store_true', help='draw the replay in a window instead of running headless')
+    parser.add_argument('--realtime', action='store_true', help='play at the normal tick rate instead of as fast as possible')
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+
+    start = time.perf_counter()
+    game = play(replay, headless=not args.render, render=args.render, realtime=args.realtime)
+    elapsed = time.perf_counter() - start
+
+    print('ticks:', len(replay), '(' + str(round(len(replay) / TICK_RATE, 1)) + 's of play)')
+    print('time:', str(round(elapsed, 2)) + 's,', int(len(replay) / max(elapsed, 1e-9)), 'ticks/s')
+
+    checksum = state_checksum(game)
+    if replay.checksum:
+        print('final state:', 'matches' if checksum == replay.checksum else 'DIVERGED', '(' + format(checksum, '08x') + ')')
+    else:
+        print('final state:', format(checksum, '08x'))
@@ -0,0 +1,183 @@
+import json
+import os
+import struct
+import threading
+import zlib
+
+import pygame
+
+from scripts.utils import BASE_IMG_PATH, load_image, load_images
+
+# every image under data/images is packed into one atlas stored in a single file:
+#   header: magic, format version, length of the index
+#   index: JSON with the atlas size, the rect of every image and the modification time and size of the source files
+#   pixels: the atlas as zlib-compressed RGB, already in the layout convert() produces so loading needs no PNG decoding
+BUNDLE_PATH = 'data/assets.bundle'
+BUNDLE_MAGIC = b'SSAB'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sHI')
+# directories of images the game never loads
+BUNDLE_EXCLUDE = {'showcases'}
+ATLAS_WIDTH = 1024
+
+
+def source_images(source=BASE_IMG_PATH):
+    """
+    Returns {path relative to the source directory: (modification time, size)} of every image that goes into the bundle.
+    """
+    sources = {}
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(directory for directory in dirs if directory not in BUNDLE_EXCLUDE)
+        prefix = root[len(source):].replace(os.sep, '/').strip('/')
+        for name in sorted(files):
+            if name.endswith('.png'):
+                stat = os.stat(os.path.join(root, name))
+                sources[prefix + '/' + name if prefix else name] = [stat.st_mtime_ns, stat.st_size]
+
+    return sources
+
+
+def build_bundle(path=BUNDLE_PATH, source=BASE_IMG_PATH):
+    """
+    Packs the source images into an atlas, in rows from the tallest image to the shortest, and writes the bundle. Needs a display mode to
+    be set since the images are converted like load_image does.
+    """
+    sources = source_images(source)
+    images = {name: pygame.image.load(source + name).convert() for name in sources}
+
+    rects = {}
+    x = y = row_height = 0
+    for name in sorted(images, key=lambda name: (-images[name].get_height(), name)):
+        width, height = images[name].get_size()
+        if x + width > ATLAS_WIDTH:
+            x = 0
+            y += row_height
+            row_height = 0
+        rects[name] = [x, y, width, height]
+        x += width
+        row_height = max(row_height, height)
+
+    atlas = pygame.Surface((ATLAS_WIDTH, max(y + row_height, 1)))
+    for name, rect in rects.items():
+        atlas.blit(images[name], rect[:2])
+
+    index = json.dumps({'size': atlas.get_size(), 'rects': rects, 'sources': sources}).encode('utf-8')
+    # written next to the old bundle and moved over it, so an interrupted build never leaves a partial bundle behind
+    f = open(path + '.tmp', 'wb')
+    f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+    f.write(index)
+    f.write(zlib.compress(pygame.image.tobytes(atlas, 'RGB'), 1))
+    f.close()
+    os.replace(path + '.tmp', path)
+
+
+class AssetBundle:
+    """
+    Hands out the game's images from the prebuilt bundle, rebuilding the bundle first when it is missing or older than the images it
+    was built from. The images are subsurfaces of one atlas with black as the colorkey, the same as load_image returns.
+    """
+    def __init__(self, path=BUNDLE_PATH, source=BASE_IMG_PATH):
+        self.path = path
+        self.source = source
+        self.atlas = None
+
+        if not self.read():
+            try:
+                build_bundle(path, source)
+                self.read()
+            except OSError:
+                # e.g. a read-only install, fall back to loading the image files one by one
+                pass
+
+    def read(self):
+        """
+        Loads the bundle with a single read.
+        :return: False if the bundle has to be rebuilt
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        f = open(self.path, 'rb')
+        data = f.read()
+        f.close()
+
+        # a truncated or otherwise damaged bundle is rebuilt like an outdated one
+        try:
+            magic, version, index_length = BUNDLE_HEADER.unpack_from(data)
+            if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                return False
+
+            index = json.loads(data[BUNDLE_HEADER.size:BUNDLE_HEADER.size + index_length])
+            if index['sources'] != source_images(self.source):
+                return False
+
+            pixels = zlib.decompress(data[BUNDLE_HEADER.size + index_length:])
+            # frombuffer wraps the pixels without copying them, convert() then makes the only copy
+            atlas = pygame.image.frombuffer(pixels, tuple(index['size']), 'RGB').convert()
+        except (struct.error, ValueError, KeyError, TypeError, zlib.error):
+            return False
+
+        self.atlas = atlas
+        self.atlas.set_colorkey((0, 0, 0))
+
+        self.rects = index['rects']
+        return True
+
+    def image(self, path):
+        if not self.atlas:
+            return load_image(path)
+
+        return self.atlas.subsurface(self.rects[path])
+
+    def images(self, path):
+        """
+        Returns every image of a directory in name order, like load_images.
+        """
+        if not self.atlas:
+            return load_images(path)
+
+        prefix = path + '/'
+        return [self.image(name) for name in sorted(self.rects) if name.startswith(prefix) and '/' not in name[len(prefix):]]
+
+
+class LazySound:
+    """
+    A pygame.mixer.Sound that is only read and decoded when it is first played (or by preload()), so startup doesn't wait for audio.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.sound = None
+        self.volume = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if not self.sound:
+                self.sound = pygame.mixer.Sound(self.path)
+                if self.volume is not None:
+                    self.sound.set_volume(self.volume)
+
+        return self.sound
+
+    def preload(self):
+        """
+        Decodes the sound on a background thread.
+        """
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def play(self, *args, **kwargs):
+        return self.load().play(*args, **kwargs)
+
+    def stop(self):
+        if self.sound:
+            self.sound.stop()
+
+    def fadeout(self, time):
+        if self.sound:
+            self.sound.fadeout(time)
+
+    def set_volume(self, volume):
+        with self.lock:
+            self.volume = volume
+            if self.sound:
+                self.sound.set_volume(volume)
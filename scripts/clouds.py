@@ -1,7 +1,11 @@
 import random
 
+import pygame
+
 
 class Cloud:
+    __slots__ = ('pos', 'image', 'speed', 'depth')
+
     def __init__(self, pos, image, speed, depth):
         self.pos = list(pos)
         self.image = image
@@ -16,12 +20,47 @@ class Cloud:
         surface.blit(self.image, (render_pos[0] % (surface.get_width() + self.image.get_width()) - self.image.get_width(), (render_pos[1] % (surface.get_height() + self.image.get_height()) - self.image.get_height())))
 
 
+class CloudBand:
+    """
+    Clouds of similar depth pre-composited into one wrap-around surface, so the whole band is drawn with a single blit. The clouds of a
+    band move at its average depth and speed, keeping their places relative to each other.
+    """
+    def __init__(self, clouds, view_size):
+        self.depth = sum(cloud.depth for cloud in clouds) / len(clouds)
+        self.speed = sum(cloud.speed for cloud in clouds) / len(clouds)
+        self.view_size = view_size
+        self.x = 0
+
+        # like Cloud.render, a cloud wraps around once it has left the view, here after the view plus the widest/tallest cloud
+        self.period = (view_size[0] + max(cloud.image.get_width() for cloud in clouds), view_size[1] + max(cloud.image.get_height() for cloud in clouds))
+
+        # one period plus a view's worth of it repeated, so any view-sized part of the band is one rect of the surface
+        self.surface = pygame.Surface((self.period[0] + view_size[0], self.period[1] + view_size[1]))
+        for cloud in clouds:
+            width, height = cloud.image.get_size()
+            x = int(cloud.pos[0] % self.period[0]) - width
+            while x < self.surface.get_width():
+                y = int(cloud.pos[1] % self.period[1]) - height
+                while y < self.surface.get_height():
+                    self.surface.blit(cloud.image, (x, y))
+                    y += self.period[1]
+                x += self.period[0]
+        self.surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+
+    def update(self):
+        self.x += self.speed
+
+    def render(self, surface, offset=(0, 0)):
+        area = ((offset[0] * self.depth - self.x) % self.period[0], (offset[1] * self.depth) % self.period[1]) + self.view_size
+        surface.blit(self.surface, (0, 0), area)
+
+
 class Clouds:
-    def __init__(self, cloud_images, count=16):
+    def __init__(self, cloud_images, count=16, rng=random):
         self.clouds = []
 
         for i in range(count):
-            self.clouds.append(Cloud((random.random() * 99999, random.random() * 99999), random.choice(cloud_images), random.random() * 0.05 + 0.05, random.random() * 0.6 + 0.2))
+            self.clouds.append(Cloud((rng.random() * 99999, rng.random() * 99999), rng.choice(cloud_images), rng.random() * 0.05 + 0.05, rng.random() * 0.6 + 0.2))
 
         # Sort clouds by depth
         # Clouds closer to the camera will be pushed to the front for rendering
@@ -34,3 +73,16 @@ class Clouds:
     def render(self, surface, offset=(0, 0)):
         for cloud in self.clouds:
             cloud.render(surface, offset=offset)
+
+    def bands(self, count, view_size):
+        """
+        Groups the clouds into count bands of equal depth ranges, from the furthest to the closest.
+        :return: a CloudBand for every band that got any clouds
+        """
+        low = self.clouds[0].depth
+        high = self.clouds[-1].depth
+        groups = [[] for i in range(count)]
+        for cloud in self.clouds:
+            groups[min(int((cloud.depth - low) / (high - low or 1) * count), count - 1)].append(cloud)
+
+        return [CloudBand(group, view_size) for group in groups if group]
@@ -0,0 +1,81 @@
+def merge_runs(cells):
+    """
+    Merges (x, y) grid cells into as few rectangles as possible: runs of neighbouring cells along each row first, then runs of the same
+    row span over consecutive rows.
+    :return: a list of (x, y, width, height) in cells
+    """
+    rows = {}
+    for x, y in cells:
+        rows.setdefault(y, []).append(x)
+
+    spans = []
+    # (first x, last x) -> [x, y, width, height] of the span that can still grow into the next row
+    open_spans = {}
+    for y in sorted(rows):
+        xs = sorted(rows[y])
+        runs = []
+        start = previous = xs[0]
+        for x in xs[1:]:
+            if x != previous + 1:
+                runs.append((start, previous))
+                start = x
+            previous = x
+        runs.append((start, previous))
+
+        next_open = {}
+        for run in runs:
+            span = open_spans.pop(run, None)
+            if span and span[1] + span[3] == y:
+                span[3] += 1
+            else:
+                if span:
+                    spans.append(span)
+                span = [run[0], y, run[1] - run[0] + 1, 1]
+            next_open[run] = span
+
+        spans.extend(open_spans.values())
+        open_spans = next_open
+    spans.extend(open_spans.values())
+
+    return [tuple(span) for span in spans]
+
+
+def sweep(tilemap, pos, size, axis, delta):
+    """
+    Moves a box along one axis, stopping against the first solid span in its path. The whole path is checked, so fast boxes can't tunnel
+    through thin walls. Boxes are truncated to whole pixels like pygame.Rect does.
+    :param pos: the (x, y) of the box before the move
+    :param size: the (width, height) of the box
+    :param axis: 0 to move along x, 1 to move along y
+    :param delta: the distance to move, negative to move left or up
+    :return: (new coordinate on the axis, normal) where the normal is the direction of the surface that was hit on the axis (-1 when
+        hitting something on the right/below, 1 on the left/above) and 0 when the move wasn't blocked
+    """
+    start = int(pos[axis])
+    target = pos[axis] + delta
+    end = int(target)
+
+    low = min(start, end)
+    length = max(start, end) + size[axis] - low
+    if axis == 0:
+        spans = tilemap.solid_spans_in((low, int(pos[1]), length, size[1]))
+    else:
+        spans = tilemap.solid_spans_in((int(pos[0]), low, size[0], length))
+
+    if spans:
+        # a box that starts the move already overlapping a span (spawned inside the ground, or truncated into it at negative
+        # coordinates) is only pushed out on the axis where it's the least deep, otherwise it would be pushed out sideways off a floor
+        other = 1 - axis
+        box = (int(pos[0]), int(pos[1]))
+        spans = [span for span in spans if min(box[other] + size[other], span[other] + span[other + 2]) - max(box[other], span[other]) >= min(box[axis] + size[axis], span[axis] + span[axis + 2]) - max(box[axis], span[axis])]
+
+    if not spans:
+        return target, 0
+
+    if delta > 0:
+        return min(span[axis] for span in spans) - size[axis], -1
+    if delta < 0:
+        return max(span[axis] + span[axis + 2] for span in spans), 1
+
+    # not moving but overlapping a solid, snap to the pixel grid
+    return start, 0
@@ -1,23 +1,49 @@
 import math
-import random
 
 import pygame
 
-from scripts.particle import Particle
-from scripts.spark import Spark
+from scripts.collision import sweep
+
+# bits of PhysicsEntity.collisions, the sides the entity was stopped on during its last update
+COLLIDE_UP = 1
+COLLIDE_DOWN = 2
+COLLIDE_LEFT = 4
+COLLIDE_RIGHT = 8
+
+
+class Projectile:
+    __slots__ = ('pos', 'speed', 'timer')
+
+    def __init__(self):
+        self.pos = [0, 0]
+        self.speed = 0  # speed-direction, negative is moving left
+        self.timer = 0
+
+    def fire(self, pos, speed):
+        self.pos[0] = pos[0]
+        self.pos[1] = pos[1]
+        self.speed = speed
+        self.timer = 0
 
 
 class PhysicsEntity:
+    # entities are created per level and updated every tick, slots keep them small and their attribute lookups fast
+    __slots__ = ('game', 'type', 'pos', 'prev_pos', 'size', 'velocity', 'collisions', 'normal', 'action', 'animation', 'animation_offset', 'flip', 'last_movement')
+
     def __init__(self, game, e_type, pos, size):
         self.game = game
         self.type = e_type
         self.pos = list(pos)
+        self.prev_pos = list(pos)
         self.size = size
         self.velocity = [0, 0]
 
-        self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}
+        self.collisions = 0
+        # direction of the surfaces the entity was stopped by on the last update, (0, 0) when it moved freely
+        self.normal = (0, 0)
 
         self.action = ''
+        self.animation = None
         self.animation_offset = (-3, -3)
         self.flip = False
         self.set_action('idle')
@@ -30,36 +56,34 @@ class PhysicsEntity:
     def set_action(self, action):
         if self.action != action:
             self.action = action
-            self.animation = self.game.assets[self.type + '/' + self.action].copy()
+            clip = self.game.assets[self.type + '/' + self.action]
+            if self.animation:
+                self.animation.start(clip)
+            else:
+                self.animation = clip.play()
 
     def update(self, tilemap, movement=(0, 0)):
-        self.collisions = {'up': False, 'down': False, 'left': False, 'right': False}
+        self.prev_pos[0] = self.pos[0]
+        self.prev_pos[1] = self.pos[1]
+
+        self.collisions = 0
 
         frame_movement = (movement[0] + self.velocity[0], movement[1] + self.velocity[1])
 
-        self.pos[0] += frame_movement[0]
-        entity_rect = self.hitbox()
-        for rect in tilemap.physics_rects_around(self.pos):
-            if entity_rect.colliderect(rect):
-                if frame_movement[0] > 0:
-                    entity_rect.right = rect.left
-                    self.collisions['right'] = True
-                elif frame_movement[0] < 0:
-                    entity_rect.left = rect.right
-                    self.collisions['left'] = True
-                self.pos[0] = entity_rect.x
-
-        self.pos[1] += frame_movement[1]
-        entity_rect = self.hitbox()
-        for rect in tilemap.physics_rects_around(self.pos):
-            if entity_rect.colliderect(rect):
-                if frame_movement[1] > 0:
-                    entity_rect.bottom = rect.top
-                    self.collisions['down'] = True
-                elif frame_movement[1] < 0:
-                    entity_rect.top = rect.bottom
-                    self.collisions['up'] = True
-                self.pos[1] = entity_rect.y
+        # one axis at a time, so sliding along a floor or a wall still moves the entity on the other axis
+        self.pos[0], normal_x = sweep(tilemap, self.pos, self.size, 0, frame_movement[0])
+        if normal_x < 0:
+            self.collisions |= COLLIDE_RIGHT
+        elif normal_x > 0:
+            self.collisions |= COLLIDE_LEFT
+
+        self.pos[1], normal_y = sweep(tilemap, self.pos, self.size, 1, frame_movement[1])
+        if normal_y < 0:
+            self.collisions |= COLLIDE_DOWN
+        elif normal_y > 0:
+            self.collisions |= COLLIDE_UP
+
+        self.normal = (normal_x, normal_y)
 
         if movement[0] > 0:
             self.flip = False
@@ -70,16 +94,25 @@ class PhysicsEntity:
 
         self.velocity[1] = min(5, self.velocity[1] + 0.1)
 
-        if self.collisions['down'] or self.collisions['up']:
+        if self.collisions & (COLLIDE_DOWN | COLLIDE_UP):
             self.velocity[1] = 0
 
         self.animation.update()
 
-    def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.image(), self.flip, False), (self.pos[0] - offset[0] + self.animation_offset[0], self.pos[1] - offset[1] + self.animation_offset[1]))
+    def render_pos(self, alpha=1.0):
+        """
+        Returns the position interpolated between the previous and the current tick.
+        """
+        return (self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha, self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha)
+
+    def render(self, surf, offset=(0, 0), alpha=1.0):
+        pos = self.render_pos(alpha)
+        surf.blit(self.animation.image(flip=self.flip), (pos[0] - offset[0] + self.animation_offset[0], pos[1] - offset[1] + self.animation_offset[1]))
 
 
 class Enemy(PhysicsEntity):
+    __slots__ = ('walking',)
+
     def __init__(self, game, pos, size):
         super().__init__(game, 'enemy', pos, size)
 
@@ -89,7 +122,7 @@ class Enemy(PhysicsEntity):
         if self.walking:
             # checks whether there's a tile in front of the enemy (via 7 to the right or left, 23 down - can be customized)
             if tilemap.solid_check((self.hitbox().centerx + (-7 if self.flip else 7), self.pos[1] + 23)):
-                if self.collisions['right'] or self.collisions['left']:
+                if self.collisions & (COLLIDE_RIGHT | COLLIDE_LEFT):
                     self.flip = not self.flip
                 else:
                     movement = (movement[0] - 0.5 if self.flip else 0.5, movement[1])  # only move on the x-axis
@@ -105,22 +138,26 @@ class Enemy(PhysicsEntity):
                 if abs(distance[1]) < 16:
                     # if enemy is facing left and the player is the left of the enemy
                     if self.flip and distance[0] < 0:
-                        self.game.sfx['shoot'].play()
-                        self.game.projectiles.append([[self.hitbox().centerx - 7, self.hitbox().centery], -1.5, 0])
+                        index = self.game.projectiles.acquire()
+                        if index != -1:
+                            self.game.sfx['shoot'].play()
+                            projectile = self.game.projectiles[index]
+                            projectile.fire((self.hitbox().centerx - 7, self.hitbox().centery), -1.5)
 
-                        for i in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], random.random() - 0.5 + math.pi, 2 + random.random()))
+                            self.game.sparks.burst(projectile.pos, [self.game.rng.effects.random() - 0.5 + math.pi for i in range(4)], [2 + self.game.rng.effects.random() for i in range(4)])
 
                     # if enemy is facing right and the player is the right of the enemy
                     if not self.flip and distance[0] > 0:
-                        self.game.sfx['shoot'].play()
-                        self.game.projectiles.append([[self.hitbox().centerx + 7, self.hitbox().centery], 1.5, 0])
+                        index = self.game.projectiles.acquire()
+                        if index != -1:
+                            self.game.sfx['shoot'].play()
+                            projectile = self.game.projectiles[index]
+                            projectile.fire((self.hitbox().centerx + 7, self.hitbox().centery), 1.5)
 
-                        for i in range(4):
-                            self.game.sparks.append(Spark(self.game.projectiles[-1][0], random.random() - 0.5, 2 + random.random()))
+                            self.game.sparks.burst(projectile.pos, [self.game.rng.effects.random() - 0.5 for i in range(4)], [2 + self.game.rng.effects.random() for i in range(4)])
 
-        elif random.random() < 0.01:
-            self.walking = random.randint(30, 120)
+        elif self.game.rng.ai.random() < 0.01:
+            self.walking = self.game.rng.ai.randint(30, 120)
 
         super().update(tilemap, movement=movement)
 
@@ -129,33 +166,35 @@ class Enemy(PhysicsEntity):
         else:
             self.set_action('idle')
 
-        if abs(self.game.player.dashing) >= 50:
-            if self.hitbox().colliderect(self.game.player.hitbox()):
+    def hit(self):
+        """
+        Plays the effects of the enemy being killed by a dash, the game removes it from the level.
+        """
+        self.game.screenshake = max(20, self.game.screenshake)
+        self.game.sfx['hit'].play()
 
-                self.game.screenshake = max(20, self.game.screenshake)
-                self.game.sfx['hit'].play()
-
-                for i in range(30):
-                    angle = random.random() * math.pi * 2
-                    speed = random.random() * 5
-                    self.game.sparks.append(Spark(self.hitbox().center, angle, 2 + random.random()))
-                    self.game.particles.append(Particle(self.game, 'particle', self.hitbox().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5], frame=random.randint(0, 7)))
+        angles = [self.game.rng.effects.random() * math.pi * 2 for i in range(30)]
+        speeds = [self.game.rng.effects.random() * 5 for i in range(30)]
+        self.game.particles.emit_many('particle', self.hitbox().center, [[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle + math.pi) * speed * 0.5] for angle, speed in zip(angles, speeds)], [self.game.rng.effects.randint(0, 7) for i in range(30)])
 
-                # Add more sparks for intensity
-                self.game.sparks.append(Spark(self.hitbox().center, 0, 5 + random.random()))
-                self.game.sparks.append(Spark(self.hitbox().center, math.pi, 5 + random.random()))
-                return True
+        # Add more sparks for intensity, two fast ones to the sides
+        self.game.sparks.burst(self.hitbox().center, angles + [0, math.pi], [2 + self.game.rng.effects.random() for i in range(30)] + [5 + self.game.rng.effects.random(), 5 + self.game.rng.effects.random()])
 
-    def render(self, surface, offset=(0, 0)):
-        super().render(surface, offset=offset)
+    def render(self, surface, offset=(0, 0), alpha=1.0):
+        super().render(surface, offset=offset, alpha=alpha)
 
+        pos = self.render_pos(alpha)
+        center = (int(pos[0]) + self.size[0] // 2, int(pos[1]) + self.size[1] // 2)
+        gun = self.game.assets['gun'].image(0, flip=self.flip)
         if self.flip:
-            surface.blit(pygame.transform.flip(self.game.assets['gun'], True, False), (self.hitbox().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.hitbox().centery - offset[1]))
+            surface.blit(gun, (center[0] - 4 - gun.get_width() - offset[0], center[1] - offset[1]))
         else:
-            surface.blit(self.game.assets['gun'], (self.hitbox().centerx + 4 - offset[0], self.hitbox().centery - offset[1]))
+            surface.blit(gun, (center[0] + 4 - offset[0], center[1] - offset[1]))
 
 
 class Player(PhysicsEntity):
+    __slots__ = ('air_time', 'jumps', 'wall_slide', 'dashing')
+
     def __init__(self, game, pos, size):
         super().__init__(game, 'player', pos, size)
         self.air_time = 0
@@ -173,16 +212,16 @@ class Player(PhysicsEntity):
                 self.game.screenshake = max(20, self.game.screenshake)
             self.game.dead += 1
 
-        if self.collisions['down']:
+        if self.collisions & COLLIDE_DOWN:
             self.air_time = 0
             self.jumps = 1
 
         self.wall_slide = False
-        if (self.collisions['right'] or self.collisions['left']) and self.air_time > 4:
+        if (self.collisions & (COLLIDE_RIGHT | COLLIDE_LEFT)) and self.air_time > 4:
             self.wall_slide = True
             self.velocity[1] = min(self.velocity[1], 0.5)
 
-            if self.collisions['right']:
+            if self.collisions & COLLIDE_RIGHT:
                 self.flip = False
             else:
                 self.flip = True
@@ -200,16 +239,16 @@ class Player(PhysicsEntity):
         if abs(self.dashing) in {60, 50}:  # if at the start of the end
             for i in range(20):
                 # Generate a random angle between 0 and 2*pi radians (full circle).
-                angle = random.random() * math.pi * 2
+                angle = self.game.rng.effects.random() * math.pi * 2
 
                 # Generate a random speed between 0.5 and 1.0.
-                speed = random.random() * 0.5 + 0.5
+                speed = self.game.rng.effects.random() * 0.5 + 0.5
 
                 # Calculate the velocity vector components (x, y) using trigonometry.
                 # cos(angle) and sin(angle) determine the direction,
                 # and multiplying by speed sets the magnitude of the velocity.
                 particle_velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                self.game.particles.append(Particle(self.game, 'particle', self.hitbox().center, velocity=particle_velocity, frame=random.randint(0, 7)))
+                self.game.particles.emit('particle', self.hitbox().center, velocity=particle_velocity, frame=self.game.rng.effects.randint(0, 7))
 
         if self.dashing > 0:
             self.dashing = max(0, self.dashing - 1)
@@ -222,9 +261,8 @@ class Player(PhysicsEntity):
             if abs(self.dashing) == 51:
                 self.velocity[0] *= 0.1
 
-            particle_velocity = [abs(self.dashing) / self.dashing * random.random() * 3, 0]  # no changes in y, dash only on x
-            self.game.particles.append(Particle(self.game, 'particle', self.hitbox().center, velocity=particle_velocity,
-                                                frame=random.randint(0, 7)))
+            particle_velocity = [abs(self.dashing) / self.dashing * self.game.rng.effects.random() * 3, 0]  # no changes in y, dash only on x
+            self.game.particles.emit('particle', self.hitbox().center, velocity=particle_velocity, frame=self.game.rng.effects.randint(0, 7))
 
         # normalization
         if self.velocity[0] > 0:
@@ -232,9 +270,9 @@ class Player(PhysicsEntity):
         else:
             self.velocity[0] = min(self.velocity[0] + 0.1, 0)
 
-    def render(self, surface, offset=(0, 0)):
+    def render(self, surface, offset=(0, 0), alpha=1.0):
         if abs(self.dashing) <= 50:
-            super().render(surface, offset=offset)
+            super().render(surface, offset=offset, alpha=alpha)
 
     def jump(self):
         if self.wall_slide:
@@ -0,0 +1,13 @@
+# The player's commands for one tick packed into a bitmask, so a tick of input fits in a single byte.
+# LEFT/RIGHT are held states, JUMP/DASH are only set on the tick the key was pressed.
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+DASH = 8
+
+
+def horizontal(inputs):
+    """
+    Returns the horizontal movement (-1, 0 or 1) for a tick's inputs.
+    """
+    return bool(inputs & RIGHT) - bool(inputs & LEFT)
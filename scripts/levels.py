@@ -0,0 +1,98 @@
+import os
+import threading
+
+from scripts.tilemap import Tilemap
+from scripts import mapformat
+
+
+class Level:
+    """
+    A map loaded into its own Tilemap with the spawners taken out, ready to be swapped in by Game.load_level.
+    """
+    def __init__(self, tilemap, spawners, trees):
+        self.tilemap = tilemap
+        self.spawners = spawners
+        self.trees = trees
+
+
+def prepare_level(game, path):
+    tilemap = Tilemap(game)
+    tilemap.load(path)
+
+    trees = tilemap.extract([('large_decor', 2)], keep=True)
+    spawners = tilemap.extract([('spawners', 0), ('spawners', 1)])
+
+    return Level(tilemap, spawners, trees)
+
+
+class LevelLoader:
+    """
+    Prepares levels on background threads so switching levels doesn't have to read and parse a map file. Only plain Python data is
+    built off the main thread, baking tile surfaces is left to Tilemap.stream().
+    """
+    def __init__(self, game, path='data/maps'):
+        self.game = game
+        self.path = path
+
+        # the maps don't change while the game runs, a level can be a JSON map or a binary map converted with scripts/mapformat.py
+        self.files = set(os.listdir(path))
+        self.count = len({name.split('.')[0] for name in self.files if name.endswith('.json') or name.endswith(mapformat.EXTENSION)})
+
+        self.threads = {}
+        self.ready = {}
+        # levels whose binary map was found to be out of date, to only warn once
+        self.stale = set()
+
+    def map_path(self, level):
+        """
+        Returns the path of a level's map, preferring the binary map since it loads faster, unless the JSON map (the one the editor
+        saves) was changed after the binary map was converted from it.
+        """
+        json_path = self.path + '/' + str(level) + '.json'
+        binary_path = self.path + '/' + str(level) + mapformat.EXTENSION
+        if str(level) + mapformat.EXTENSION not in self.files:
+            return json_path
+        if str(level) + '.json' in self.files and os.path.getmtime(binary_path) < os.path.getmtime(json_path):
+            if level not in self.stale:
+                self.stale.add(level)
+                print('warning: ' + binary_path + ' is older than ' + json_path + ', loading the JSON map; convert it again with scripts/mapformat.py')
+            return json_path
+
+        return binary_path
+
+    def prefetch(self, level):
+        """
+        Starts preparing a level in the background, unless it is already prepared or being prepared.
+        """
+        if not 0 <= level < self.count or level in self.ready or level in self.threads:
+            return
+
+        thread = threading.Thread(target=self.load, args=(level,), daemon=True)
+        self.threads[level] = thread
+        thread.start()
+
+    def load(self, level):
+        # a level that fails to load here is loaded again by take(), which raises the error on the main thread
+        self.ready[level] = prepare_level(self.game, self.map_path(level))
+
+    def wait(self):
+        """
+        Blocks until every level that is being prepared is ready, e.g. so no loading happens while something is timed.
+        """
+        for thread in self.threads.values():
+            thread.join()
+
+    def take(self, level):
+        """
+        Returns the prepared level, waiting for its thread if it hasn't finished yet or loading it right away if it wasn't prefetched.
+        Every Level can only be taken once since playing it changes its tilemap.
+        """
+        thread = self.threads.pop(level, None)
+        if thread:
+            thread.join()
+
+        prepared = self.ready.pop(level, None)
+        if not prepared:
+            prepared = prepare_level(self.game, self.map_path(level))
+
+        return prepared
@@ -0,0 +1,148 @@
+import argparse
+import json
+import mmap
+import struct
+
+# binary maps, the same content as the JSON written by Tilemap.save:
+#   header: magic, format version, tile size, chunk shift, number of tile types, chunks and offgrid tiles
+#   tile type names: a length byte and the UTF-8 name for each, tiles refer to them by position starting at 1 (0 is an empty cell)
+#   chunks: chunk x and y, tile count, then the type ids and the variants of the chunk's cells as two arrays of one byte per cell
+#   offgrid tiles in drawing order: type id, variant, whether x and y are whole numbers, x and y
+MAGIC = b'SSMP'
+VERSION = 1
+EXTENSION = '.map'
+
+HEADER = struct.Struct('<4sHHBHII')
+CHUNK_HEADER = struct.Struct('<iiH')
+OFFGRID_TILE = struct.Struct('<HHBdd')
+
+
+def encode(map_data, chunk_shift=4):
+    """
+    Packs map data as loaded from a JSON map into the binary format.
+    :return: the bytes of the binary map
+    """
+    chunk_size = 1 << chunk_shift
+    mask = chunk_size - 1
+
+    type_ids = {}
+    chunks = {}
+    for tile in map_data['tilemap'].values():
+        x, y = int(tile['pos'][0]), int(tile['pos'][1])
+        key = (x >> chunk_shift, y >> chunk_shift)
+        if key not in chunks:
+            chunks[key] = [0, bytearray(chunk_size * chunk_size), bytearray(chunk_size * chunk_size)]
+        chunk = chunks[key]
+
+        index = ((y & mask) << chunk_shift) | (x & mask)
+        if not chunk[1][index]:
+            chunk[0] += 1
+        chunk[1][index] = type_ids.setdefault(tile['type'], len(type_ids) + 1)
+        chunk[2][index] = tile['variant']
+
+    for tile in map_data['offgrid']:
+        type_ids.setdefault(tile['type'], len(type_ids) + 1)
+
+    data = [HEADER.pack(MAGIC, VERSION, map_data['tile_size'], chunk_shift, len(type_ids), len(chunks), len(map_data['offgrid']))]
+    for tile_type in type_ids:
+        name = tile_type.encode('utf-8')
+        data.append(bytes([len(name)]) + name)
+    for (cx, cy), (count, types, variants) in chunks.items():
+        data += [CHUNK_HEADER.pack(cx, cy, count), types, variants]
+    for tile in map_data['offgrid']:
+        x, y = tile['pos']
+        data.append(OFFGRID_TILE.pack(type_ids[tile['type']], tile['variant'], isinstance(x, int) | isinstance(y, int) << 1, x, y))
+
+    return b''.join(data)
+
+
+class BinaryMap:
+    """
+    The parsed sections of a binary map. The chunk arrays are memoryviews into the buffer the map was read from, so nothing is copied
+    until the cells are used.
+    """
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+
+        magic, version, self.tile_size, self.chunk_shift, type_count, chunk_count, offgrid_count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('not a binary map')
+        if version != VERSION:
+            raise ValueError('unsupported binary map version: ' + str(version))
+        offset = HEADER.size
+
+        # index 0 is the empty cell
+        self.tile_types = [None]
+        for i in range(type_count):
+            length = view[offset]
+            self.tile_types.append(str(view[offset + 1:offset + 1 + length], 'utf-8'))
+            offset += 1 + length
+
+        cells = 1 << (self.chunk_shift * 2)
+        self.chunks = []
+        for i in range(chunk_count):
+            cx, cy, count = CHUNK_HEADER.unpack_from(view, offset)
+            offset += CHUNK_HEADER.size
+            self.chunks.append((cx, cy, count, view[offset:offset + cells], view[offset + cells:offset + cells * 2]))
+            offset += cells * 2
+
+        self.offgrid = []
+        for i in range(offgrid_count):
+            type_id, variant, whole, x, y = OFFGRID_TILE.unpack_from(view, offset)
+            offset += OFFGRID_TILE.size
+            self.offgrid.append({'type': self.tile_types[type_id], 'variant': variant, 'pos': [int(x) if whole & 1 else x, int(y) if whole & 2 else y]})
+
+    def to_json(self):
+        """
+        Returns the map data in the JSON layout of Tilemap.save.
+        """
+        mask = (1 << self.chunk_shift) - 1
+        tilemap = {}
+        for cx, cy, count, types, variants in self.chunks:
+            for index in range(len(types)):
+                if types[index]:
+                    x = (cx << self.chunk_shift) | (index & mask)
+                    y = (cy << self.chunk_shift) | (index >> self.chunk_shift)
+                    tilemap[str(x) + ';' + str(y)] = {'type': self.tile_types[types[index]], 'variant': variants[index], 'pos': [x, y]}
+
+        return {'tilemap': tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid}
+
+
+def open_map(path):
+    """
+    Memory-maps a binary map. The mapping is copy-on-write, so tiles can be edited in place without touching the file, and only the
+    pages of the chunks that are actually used are read from disk.
+    """
+    f = open(path, 'rb')
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    f.close()
+    return BinaryMap(buffer)
+
+
+def convert(source, destination):
+    """
+    Converts a map between the JSON and the binary format, depending on the extension of the destination.
+    """
+    if source.endswith(EXTENSION):
+        map_data = open_map(source).to_json()
+    else:
+        f = open(source, 'r')
+        map_data = json.load(f)
+        f.close()
+
+    if destination.endswith(EXTENSION):
+        f = open(destination, 'wb')
+        f.write(encode(map_data))
+    else:
+        f = open(destination, 'w')
+        json.dump(map_data, f)
+    f.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert maps between the JSON and the binary (' + EXTENSION + ') format')
+    parser.add_argument('source')
+    parser.add_argument('destination', help='the format is picked from the extension, ' + EXTENSION + ' for binary and JSON otherwise')
+    args = parser.parse_args()
+
+    convert(args.source, args.destination)
@@ -0,0 +1,94 @@
+import gc
+import sys
+import types
+
+import numpy as np
+import pygame
+
+# objects that are never owned by a subsystem
+SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_size(obj, seen):
+    """
+    Returns the bytes of obj and everything it references that isn't in seen, adding what it counted to seen. Surfaces count their
+    pixels (subsurfaces nothing, they share their parent's) and NumPy arrays their data.
+    :param seen: ids of the objects not to count, e.g. ones shared with other subsystems
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+
+        size += sys.getsizeof(obj)
+        if isinstance(obj, pygame.Surface):
+            if not obj.get_parent():
+                size += obj.get_width() * obj.get_height() * obj.get_bytesize()
+        elif isinstance(obj, np.ndarray):
+            # getsizeof already counts the data of arrays that own it
+            if obj.base is not None:
+                stack.append(obj.base)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+
+    return size
+
+
+def memory_report(game):
+    """
+    Counts the live objects of every subsystem and the bytes they own. What subsystems share (the game, the images and the animation
+    clips) isn't counted.
+    :return: {subsystem: (live objects, bytes)}
+    """
+    shared = {id(game), id(game.assets), id(game.sfx)}
+    for asset in game.assets.values():
+        shared.add(id(asset))
+
+    frame_buffers = [game.display, game.display_without_outline, game.outline.silhouette, game.presenter.screen]
+    if game.presenter.mode != 'sdl':
+        frame_buffers += [game.presenter.target] + game.presenter.steps
+
+    # every object is counted once, by the first subsystem that reaches it
+    subsystems = [
+        ('player', 1, game.player),
+        ('enemies', len(game.enemies), game.enemies),
+        ('projectiles', len(game.projectiles), game.projectiles),
+        ('particles', len(game.particles), game.particles),
+        ('sparks', len(game.sparks), game.sparks),
+        ('baked tile chunks', len(game.tilemap.render_cache), game.tilemap.render_cache),
+        ('tilemap', sum(chunk.count for chunk in game.tilemap.chunks.values()), game.tilemap),
+        ('prepared levels', len(game.levels.ready), game.levels.ready),
+        ('background', len(game.background.layers), game.background),
+        ('transitions', len(game.transitions.iris_cache), game.transitions),
+        ('frame buffers', len(frame_buffers), frame_buffers),
+    ]
+
+    report = {}
+    for name, count, obj in subsystems:
+        report[name] = (count, deep_size(obj, shared))
+
+    return report
+
+
+def format_report(report):
+    lines = ['%-20s %8s %12s' % ('subsystem', 'objects', 'bytes')]
+    for name, (count, size) in report.items():
+        lines.append('%-20s %8d %12d' % (name, count, size))
+    # frozen objects (see Game.load_level) aren't in gc.get_objects()
+    lines.append('%-20s %8d %12s' % ('gc tracked objects', len(gc.get_objects()), ''))
+    lines.append('%-20s %8d %12s' % ('gc frozen objects', gc.get_freeze_count(), ''))
+
+    return '\n'.join(lines)
@@ -0,0 +1,81 @@
+import json
+import math
+import random
+
+import pygame
+
+from scripts.clouds import Clouds
+
+LAYERS_PATH = 'data/parallax.json'
+
+
+class ImageLayer:
+    """
+    An image that moves at depth times the camera's speed, repeated horizontally. A depth of 0 keeps it still, like the sky.
+    """
+    def __init__(self, image, view_size, depth=0, pos=(0, 0)):
+        self.depth = depth
+        self.pos = pos
+        self.view_size = view_size
+        self.period = image.get_width()
+
+        if depth:
+            # enough copies side by side that any view-wide part of the row is one rect of the surface
+            self.image = pygame.Surface((self.period * (math.ceil(view_size[0] / self.period) + 1), image.get_height()))
+            for x in range(0, self.image.get_width(), self.period):
+                self.image.blit(image, (x, 0))
+            if image.get_colorkey():
+                self.image.set_colorkey(image.get_colorkey(), pygame.RLEACCEL)
+        else:
+            self.image = image
+
+    def update(self):
+        pass
+
+    def render(self, surface, offset=(0, 0)):
+        if not self.depth:
+            surface.blit(self.image, self.pos)
+            return
+
+        area = ((offset[0] * self.depth - self.pos[0]) % self.period, 0, self.view_size[0], self.image.get_height())
+        surface.blit(self.image, (0, self.pos[1] - offset[1] * self.depth), area)
+
+
+class Parallax:
+    """
+    The background: layers drawn from the furthest to the closest, each with one blit no matter how many clouds it holds.
+    """
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path, bundle, view_size, rng=random):
+        """
+        Builds the layers listed in a JSON file, in drawing order:
+            {"type": "image", "image": "background.png", "depth": 0, "pos": [0, 0]}
+            {"type": "clouds", "images": "clouds", "count": 16, "bands": 3}
+        :param bundle: the AssetBundle the images are taken from, paths are relative to data/images
+        """
+        f = open(path, 'r')
+        layer_data = json.load(f)['layers']
+        f.close()
+
+        layers = []
+        for layer in layer_data:
+            if layer['type'] == 'image':
+                layers.append(ImageLayer(bundle.image(layer['image']), view_size, layer.get('depth', 0), tuple(layer.get('pos', (0, 0)))))
+            elif layer['type'] == 'clouds':
+                clouds = Clouds(bundle.images(layer['images']), count=layer.get('count', 16), rng=rng)
+                layers += clouds.bands(layer.get('bands', 3), view_size)
+            else:
+                raise ValueError('unknown parallax layer type: ' + str(layer['type']))
+
+        return cls(layers)
+
+    def update(self):
+        for layer in self.layers:
+            layer.update()
+
+    def render(self, surface, offset=(0, 0)):
+        for layer in self.layers:
+            layer.render(surface, offset=offset)
@@ -1,25 +1,119 @@
-class Particle:
-    def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0):
+import numpy as np
+
+
+class ParticleSystem:
+    """
+    Keeps every live particle in preallocated NumPy arrays (structure of arrays) so the whole set is updated in one vectorized step.
+    The arrays are allocated once with a fixed capacity and reused, live particles are always packed at the front.
+    """
+    def __init__(self, game, p_types=('leaf', 'particle'), capacity=1024):
         self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
+        self.types = list(p_types)
+        self.count = 0
+
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int32)
+        self.dead = np.zeros(capacity, dtype=bool)
+
+        # frame -> image lookup table shared by all particles of a type, indexed by frame_base[kind] + frame
+        self.images = []
+        frame_table = []
+        frame_base = []
+        last_frame = []
+        for p_type in self.types:
+            animation = self.game.assets['particles/' + p_type]
+            frame_base.append(len(frame_table))
+            last_frame.append(len(animation.images) * animation.image_duration - 1)
+            for frame in range(len(animation.images) * animation.image_duration):
+                frame_table.append(len(self.images) + frame // animation.image_duration)
+            self.images.extend(animation.images)
+
+        self.frame_table = np.array(frame_table, dtype=np.int32)
+        self.frame_base = np.array(frame_base, dtype=np.int32)
+        self.last_frame = np.array(last_frame, dtype=np.int32)
+        self.half_sizes = np.array([(image.get_width() // 2, image.get_height() // 2) for image in self.images], dtype=np.float64).reshape(-1, 2)
+
+        # leaves sway sideways as they fall
+        self.sway = np.array([p_type == 'leaf' for p_type in self.types])
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.frame)
 
-        self.animation = self.game.assets['particles/' + self.type].copy()
-        self.animation.frame = frame
+    def clear(self):
+        self.count = 0
+
+    def emit(self, p_type, pos, velocity=(0, 0), frame=0):
+        # the arrays are a fixed-size pool, once it is full new particles are dropped
+        if self.count == self.capacity:
+            return
+
+        i = self.count
+        self.pos[i] = pos
+        self.velocity[i] = velocity
+        self.frame[i] = frame
+        self.kind[i] = self.types.index(p_type)
+        self.dead[i] = False
+        self.count += 1
+
+    def emit_many(self, p_type, pos, velocities, frames=0):
+        """
+        Adds len(velocities) particles of one type at once. pos may be a single position or one per particle.
+        """
+        amount = min(len(velocities), self.capacity - self.count)
+        if amount <= 0:
+            return
+
+        batch = slice(self.count, self.count + amount)
+        self.pos[batch] = pos if np.ndim(pos) == 1 else pos[:amount]
+        self.velocity[batch] = velocities[:amount]
+        self.frame[batch] = frames if np.ndim(frames) == 0 else frames[:amount]
+        self.kind[batch] = self.types.index(p_type)
+        self.dead[batch] = False
+        self.count += amount
 
     def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
+        # particles that finished last frame were still rendered once, drop them before moving everything else
+        n = self.count
+        if self.dead[:n].any():
+            alive = ~self.dead[:n]
+            n = int(alive.sum())
+            for array in [self.pos, self.velocity, self.frame, self.kind]:
+                array[:n] = array[:self.count][alive]
+            self.dead[:n] = False
+            self.count = n
 
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
+        if not n:
+            return
 
-        self.animation.update()
+        frame = self.frame[:n]
+        kind = self.kind[:n]
+        last_frame = self.last_frame[kind]
 
-        return kill
+        self.dead[:n] = frame >= last_frame
+        np.minimum(frame + 1, last_frame, out=frame)
+        self.pos[:n] += self.velocity[:n]
+
+        sway = self.sway[kind]
+        self.pos[:n, 0][sway] += np.sin(frame[sway] * 0.035) * 0.3
 
     def render(self, surface, offset=(0, 0)):
-        image = self.animation.image()
-        surface.blit(image, (self.pos[0] - offset[0] - image.get_width() // 2, self.pos[1] - offset[1] - image.get_height() // 2))
+        n = self.count
+        if not n:
+            return
+
+        image_ids = self.frame_table[self.frame_base[self.kind[:n]] + self.frame[:n]]
+        positions = self.pos[:n] - offset - self.half_sizes[image_ids]
+
+        # skip the blits of particles entirely outside the surface
+        visible = ((positions > -2 * self.half_sizes[image_ids] - 1) & (positions < surface.get_size())).all(axis=1)
+        if not visible.all():
+            image_ids = image_ids[visible]
+            positions = positions[visible]
+
+        surface.blits(zip(map(self.images.__getitem__, image_ids.tolist()), positions.tolist()), doreturn=False)
@@ -0,0 +1,62 @@
+class Pool:
+    """
+    Fixed-capacity pool of preallocated objects. An acquired slot keeps its index until it is released, and released slots are reused
+    instead of allocating new objects, so steady-state gameplay doesn't create garbage.
+    """
+    def __init__(self, factory, capacity):
+        self.items = [factory() for i in range(capacity)]
+
+        # stack of free slot indices, the most recently released one on top
+        self.free = list(range(capacity - 1, -1, -1))
+        # the acquired slot indices packed at the front, and the position of every slot in them (-1 for free slots), so releasing a
+        # slot is a swap with the last one instead of a search
+        self.indices = []
+        self.positions = [-1] * capacity
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __iter__(self):
+        """
+        Yields (index, item) for every acquired slot, from the last acquired one backwards. The slot being visited can be released
+        while looping: the slot swapped into its place has already been visited.
+        """
+        for position in range(len(self.indices) - 1, -1, -1):
+            index = self.indices[position]
+            yield index, self.items[index]
+
+    @property
+    def capacity(self):
+        return len(self.items)
+
+    def acquire(self):
+        """
+        Takes a free slot.
+        :return: the index of the slot, or -1 if the pool is exhausted
+        """
+        if not self.free:
+            return -1
+
+        index = self.free.pop()
+        self.positions[index] = len(self.indices)
+        self.indices.append(index)
+        return index
+
+    def release(self, index):
+        position = self.positions[index]
+        if position != -1:
+            last = self.indices.pop()
+            if last != index:
+                self.indices[position] = last
+                self.positions[last] = position
+            self.positions[index] = -1
+            self.free.append(index)
+
+    def clear(self):
+        for index in self.indices:
+            self.positions[index] = -1
+        self.indices.clear()
+        self.free[:] = range(len(self.items) - 1, -1, -1)
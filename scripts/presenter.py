@@ -0,0 +1,134 @@
+import pygame
+
+PRESENT_MODES = {'scale', 'scale2x', 'sdl'}
+
+
+class Presenter:
+    """
+    Opens the window and puts the low resolution frame on it at a whole number scale, so pixels stay square. Nothing is allocated per
+    frame: the frame is scaled straight into the window surface, or into one surface made up front when it has to be offset (screenshake).
+
+    Modes:
+        'scale'   - nearest neighbour scaling, the original look
+        'scale2x' - pygame's scale2x edge smoothing, applied repeatedly for scales of 4, 8...; the scale must be a power of two
+        'sdl'     - the window is opened at the frame size with pygame.SCALED and SDL does the scaling, on the GPU where there is one;
+                    SDL picks the scale from the desktop size; falls back to 'scale' without a renderer
+    """
+    def __init__(self, size, scale=2, window_size=None, mode='scale'):
+        """
+        :param size: the size of the frames that will be presented
+        :param scale: the whole number scale, None to use the largest one that fits in window_size
+        :param window_size: the size of the window, the scaled frame is centred in it; defaults to the size of the scaled frame
+        """
+        if mode not in PRESENT_MODES:
+            raise ValueError('unknown present mode: ' + str(mode))
+        if scale is None:
+            if not window_size:
+                raise ValueError('either a scale or a window size is needed')
+            scale = max(1, min(window_size[0] // size[0], window_size[1] // size[1]))
+        if scale < 1 or scale != int(scale):
+            raise ValueError('the scale has to be a whole number of at least 1')
+        if mode == 'scale2x' and scale & (scale - 1):
+            raise ValueError('scale2x needs a power of two scale')
+
+        self.size = size
+        self.mode = mode
+        self.scale = int(scale)
+        self.rects = None
+
+        if mode == 'sdl':
+            try:
+                self.screen = pygame.display.set_mode(size, pygame.SCALED)
+                self.pixel_scale = 1
+                self.origin = (0, 0)
+                return
+            except pygame.error:
+                # no renderer to scale with (e.g. the dummy video driver), scale in software instead
+                self.mode = mode = 'scale'
+
+        scaled_size = (size[0] * self.scale, size[1] * self.scale)
+        window_size = window_size or scaled_size
+        if window_size[0] < scaled_size[0] or window_size[1] < scaled_size[1]:
+            raise ValueError('a window of ' + str(window_size) + ' is too small for the frame at ' + str(self.scale) + 'x')
+
+        self.screen = pygame.display.set_mode(window_size)
+        self.pixel_scale = self.scale
+        self.origin = ((window_size[0] - scaled_size[0]) // 2, (window_size[1] - scaled_size[1]) // 2)
+        self.view = self.screen.subsurface((self.origin, scaled_size))
+        self.target = pygame.Surface(scaled_size)
+
+        # scale2x only doubles, larger scales go through intermediate sizes
+        self.steps = []
+        step_size = size
+        while mode == 'scale2x' and step_size[0] * 2 < scaled_size[0]:
+            step_size = (step_size[0] * 2, step_size[1] * 2)
+            self.steps.append(pygame.Surface(step_size))
+
+    def to_frame(self, pos):
+        """
+        Converts a position on the window (e.g. the mouse) to frame pixels.
+        """
+        return ((pos[0] - self.origin[0]) / self.pixel_scale, (pos[1] - self.origin[1]) / self.pixel_scale)
+
+    def scale_into(self, source, dest):
+        if self.mode == 'scale':
+            pygame.transform.scale(source, dest.get_size(), dest)
+            return
+
+        for step in self.steps:
+            pygame.transform.scale2x(source, step)
+            source = step
+        pygame.transform.scale2x(source, dest)
+
+    def present(self, source, offset=(0, 0), dirty=None):
+        """
+        Draws a frame on the window, call update() to show it.
+        :param offset: where to draw the frame relative to its usual position, in window pixels
+        :param dirty: the rects of the frame that changed since the last one, or None if everything could have. Only those parts of the
+            window are redrawn and updated, an empty list leaves the window as it is.
+        """
+        offset = (int(offset[0]), int(offset[1]))
+        if offset != (0, 0):
+            dirty = None
+
+        if dirty is not None:
+            bounds = source.get_rect()
+            dirty = [rect.clip(bounds) for rect in map(pygame.Rect, dirty)]
+            dirty = [rect for rect in dirty if rect.width and rect.height]
+
+        if self.mode == 'sdl':
+            if dirty is None:
+                self.screen.blit(source, (offset[0] // self.scale, offset[1] // self.scale))
+            for rect in dirty or []:
+                self.screen.blit(source, rect, rect)
+            self.rects = dirty
+            return
+
+        if dirty is None:
+            if offset == (0, 0):
+                self.scale_into(source, self.view)
+            else:
+                self.scale_into(source, self.target)
+                self.screen.blit(self.target, (self.origin[0] + offset[0], self.origin[1] + offset[1]))
+            self.rects = None
+            return
+
+        scale = self.pixel_scale
+        self.rects = []
+        if dirty and self.mode == 'scale2x':
+            # scale2x looks at the neighbours of every pixel, so parts of the frame can't be scaled on their own
+            self.scale_into(source, self.view)
+        for rect in dirty:
+            window_rect = pygame.Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+            if self.mode == 'scale':
+                self.scale_into(source.subsurface(rect), self.view.subsurface(window_rect))
+            self.rects.append(window_rect.move(self.origin))
+
+    def update(self):
+        """
+        Shows what was presented since the last update, only the dirty rects if present() was given any.
+        """
+        if self.rects is None:
+            pygame.display.update()
+        elif self.rects:
+            pygame.display.update(self.rects)
@@ -0,0 +1,130 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Times named phases of every frame. start()/stop() only add perf_counter deltas to a dict, so leaving the profiler on costs a few
+    microseconds per frame. Finished frames go into a rolling history (for percentiles and the overlay) and a longer trace that can be
+    dumped as CSV or JSON.
+    """
+    def __init__(self, history=300, trace_length=36000):
+        self.history = history
+        self.samples = {}
+        self.trace = deque(maxlen=trace_length)
+        self.frame_times = deque(maxlen=history)
+
+        self.current = {}
+        self.starts = {}
+        self.frame_start = time.perf_counter()
+        self.frame = 0
+
+        self.overlay = False
+        self.font = None
+
+    def start(self, name):
+        self.starts[name] = time.perf_counter()
+
+    def stop(self, name):
+        self.current[name] = self.current.get(name, 0) + time.perf_counter() - self.starts[name]
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self, counts=None):
+        """
+        Closes the frame and records every phase time in milliseconds.
+        :param counts: optional object counts to store with the frame, e.g. {'particles': 120}
+        """
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.frame_times.append(frame_ms)
+
+        row = {'frame': self.frame, 'total': frame_ms}
+        for name, seconds in self.current.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.history)
+            self.samples[name].append(seconds * 1000)
+            row[name] = seconds * 1000
+        if counts:
+            row.update(counts)
+
+        self.trace.append(row)
+        self.frame += 1
+
+    def percentiles(self, name=None, points=(50, 95, 99)):
+        """
+        Returns the given percentiles in milliseconds of a phase over the rolling history, or of whole frames when name is None.
+        """
+        values = sorted(self.frame_times if name is None else self.samples.get(name, ()))
+        if not values:
+            return tuple(0 for point in points)
+
+        return tuple(values[min(len(values) - 1, int(len(values) * point / 100))] for point in points)
+
+    def render_overlay(self, surface, counts=None):
+        if not self.overlay:
+            return
+
+        if not self.font:
+            self.font = pygame.font.Font(None, 18)
+
+        p50, p95, p99 = self.percentiles()
+        lines = ['frame  p50 %.2f  p95 %.2f  p99 %.2f ms' % (p50, p95, p99)]
+        for name in self.samples:
+            p50, p95, p99 = self.percentiles(name)
+            lines.append('%-12s %6.2f %6.2f %6.2f' % (name, p50, p95, p99))
+        if counts:
+            lines.append('  '.join(name + ' ' + str(count) for name, count in counts.items()))
+
+        background = pygame.Surface((surface.get_width(), len(lines) * 14 + 6))
+        background.set_alpha(160)
+        surface.blit(background, (0, 0))
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, False, (255, 255, 255)), (4, 4 + i * 14))
+
+    def dump(self, path):
+        """
+        Writes the trace to path, as JSON when the path ends in .json and as CSV otherwise.
+        """
+        rows = list(self.trace)
+        columns = []
+        for row in rows:
+            for name in row:
+                if name not in columns:
+                    columns.append(name)
+
+        f = open(path, 'w', newline='')
+        if path.endswith('.json'):
+            json.dump({'columns': columns, 'frames': rows}, f)
+        else:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(rows)
+        f.close()
+
+
+class StageTimer:
+    """
+    Times consecutive stages of a one-off process such as startup.
+    """
+    def __init__(self):
+        self.stages = []
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, name):
+        """
+        Ends the stage that started at the previous mark (or at creation).
+        """
+        now = time.perf_counter()
+        self.stages.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        lines = ['%-12s %8.1f ms' % stage for stage in self.stages]
+        lines.append('%-12s %8.1f ms' % ('total', (self.last - self.start) * 1000))
+        return '\n'.join(lines)
@@ -0,0 +1,74 @@
+import struct
+import zlib
+
+# header: magic, format version, rng seed, starting level, tick count, checksum of the final game state (0 if unknown)
+MAGIC = b'SSRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHIHII')
+
+
+def state_checksum(game):
+    """
+    CRC32 of the gameplay state that a deterministic replay has to reproduce exactly.
+    """
+    state = [game.level, game.dead, game.transition, len(game.enemies), game.player.dashing, game.player.air_time]
+    state += game.player.pos + game.player.velocity
+    for enemy in game.enemies:
+        state += enemy.pos
+
+    return zlib.crc32(repr(state).encode())
+
+
+class InputRecorder:
+    """
+    Captures the input bitmask of every simulated tick (see scripts/inputs.py).
+    """
+    def __init__(self, seed, level=0):
+        self.seed = seed
+        self.level = level
+        self.inputs = bytearray()
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def save(self, path, checksum=0):
+        # one byte per tick, deflated since held keys make long runs of the same byte
+        f = open(path, 'wb')
+        f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.level, len(self.inputs), checksum))
+        f.write(zlib.compress(bytes(self.inputs), 9))
+        f.close()
+
+
+class Replay:
+    def __init__(self, seed, level, inputs, checksum=0):
+        self.seed = seed
+        self.level = level
+        self.inputs = inputs
+        self.checksum = checksum
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __iter__(self):
+        return iter(self.inputs)
+
+    @classmethod
+    def load(cls, path):
+        f = open(path, 'rb')
+        data = f.read()
+        f.close()
+
+        magic, version, seed, level, ticks, checksum = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(path + ' is not a replay file')
+        if version != VERSION:
+            raise ValueError('unsupported replay version ' + str(version))
+
+        inputs = zlib.decompress(data[HEADER.size:])
+        if len(inputs) != ticks:
+            raise ValueError(path + ' is truncated')
+
+        return cls(seed, level, inputs, checksum)
@@ -0,0 +1,25 @@
+import random
+
+# each subsystem draws from its own stream, so e.g. extra effects or render-only randomness can't shift the enemy AI
+SUBSYSTEMS = ['ai', 'effects', 'leaves', 'clouds', 'screenshake']
+# seeds are stored in replays as 32-bit unsigned integers
+SEED_RANGE = 2 ** 32
+
+
+class RandomStreams:
+    """
+    A seeded random.Random per subsystem, available as attributes (rng.ai, rng.effects, ...).
+    """
+    def __init__(self, seed=None):
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        if seed is None:
+            seed = random.randrange(SEED_RANGE)
+        if not 0 <= seed < SEED_RANGE:
+            raise ValueError('the seed has to be between 0 and ' + str(SEED_RANGE - 1))
+
+        self.base_seed = seed
+        for name in SUBSYSTEMS:
+            # string seeds are hashed with sha512 by random.Random, so the streams are stable across runs and platforms
+            setattr(self, name, random.Random(str(seed) + ':' + name))
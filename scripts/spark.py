@@ -1,30 +1,101 @@
 import math
+
+import numpy as np
 import pygame
 
 
-class Spark:
-    def __init__(self, pos, angle, speed):
-        self.pos = list(pos)
-        self.angle = angle
-        self.speed = speed
+class SparkSystem:
+    """
+    Pool of sparks stored as arrays. The direction of a spark never changes, so its cos/sin are computed once when it is added.
+    """
+    def __init__(self, capacity=256, color=(255, 255, 255)):
+        self.color = color
+        self.count = 0
+
+        self.pos = np.zeros((capacity, 2))
+        self.direction = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.dead = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.speed)
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, pos, angle, speed):
+        # fixed-size pool, once it is full new sparks are dropped
+        if self.count == self.capacity:
+            return
+
+        i = self.count
+        self.pos[i] = pos
+        self.direction[i] = (math.cos(angle), math.sin(angle))
+        self.speed[i] = speed
+        self.dead[i] = False
+        self.count += 1
+
+    def burst(self, pos, angles, speeds):
+        """
+        Adds one spark per angle in a single bulk insert. pos and speeds may be shared or given per spark.
+        """
+        amount = min(len(angles), self.capacity - self.count)
+        if amount <= 0:
+            return
+
+        angles = np.asarray(angles[:amount], dtype=np.float64)
+        batch = slice(self.count, self.count + amount)
+        self.pos[batch] = pos if np.ndim(pos) == 1 else pos[:amount]
+        np.cos(angles, out=self.direction[batch, 0])
+        np.sin(angles, out=self.direction[batch, 1])
+        self.speed[batch] = speeds if np.ndim(speeds) == 0 else speeds[:amount]
+        self.dead[batch] = False
+        self.count += amount
 
     def update(self):
-        self.pos[0] += math.cos(self.angle) * self.speed
-        self.pos[1] += math.sin(self.angle) * self.speed
+        # sparks that ran out of speed were rendered one last time, compact them away before moving the rest
+        n = self.count
+        if self.dead[:n].any():
+            alive = ~self.dead[:n]
+            n = int(alive.sum())
+            for array in [self.pos, self.direction, self.speed]:
+                array[:n] = array[:self.count][alive]
+            self.dead[:n] = False
+            self.count = n
 
-        self.speed = max(0, self.speed - 0.1)
-        return not self.speed
+        if not n:
+            return
+
+        speed = self.speed[:n]
+        self.pos[:n] += self.direction[:n] * speed[:, None]
+        np.maximum(speed - 0.1, 0, out=speed)
+        self.dead[:n] = speed == 0
 
     def render(self, surface, offset=(0, 0)):
-        render_points = [
-            (self.pos[0] + math.cos(self.angle) * self.speed * 3 - offset[0],
-             self.pos[1] + math.sin(self.angle) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[0],
-             self.pos[1] + math.sin(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0],
-             self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0],
-             self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-        ]
-
-        pygame.draw.polygon(surface, (255, 255, 255), render_points)
+        n = self.count
+        if not n:
+            return
+
+        # the four corners of the diamond: front, right side, back, left side
+        pos = self.pos[:n] - offset
+        forward = self.direction[:n] * (self.speed[:n] * 3)[:, None]
+        side = self.direction[:n, ::-1] * (self.speed[:n] * 0.5)[:, None] * (-1, 1)
+
+        points = np.empty((n, 4, 2))
+        points[:, 0] = pos + forward
+        points[:, 1] = pos + side
+        points[:, 2] = pos - forward
+        points[:, 3] = pos - side
+
+        # only draw the sparks with part of their diamond on the surface
+        visible = ((points.max(axis=1) >= -1) & (points.min(axis=1) <= np.array(surface.get_size()) + 1)).all(axis=1)
+        if not visible.all():
+            points = points[visible]
+
+        color = self.color
+        for render_points in points.tolist():
+            pygame.draw.polygon(surface, color, render_points)
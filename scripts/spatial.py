@@ -0,0 +1,103 @@
+import math
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+
+        # id(item) -> (item, rect, cell keys, insertion order) so items don't have to be hashable (e.g. offgrid tile dicts)
+        self.entries = {}
+        self.inserted = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return id(item) in self.entries
+
+    def cell_range(self, rect):
+        """
+        Returns the (x0, y0, x1, y1) inclusive range of cells overlapped by a rect of (x, y, width, height).
+        """
+        return (math.floor(rect[0] / self.cell_size), math.floor(rect[1] / self.cell_size),
+                math.floor((rect[0] + max(rect[2], 1) - 1e-6) / self.cell_size), math.floor((rect[1] + max(rect[3], 1) - 1e-6) / self.cell_size))
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.inserted = 0
+
+    def insert(self, item, rect):
+        if id(item) in self.entries:
+            self.remove(item)
+
+        rect = tuple(rect)
+        x0, y0, x1, y1 = self.cell_range(rect)
+        keys = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append(item)
+                keys.append((cx, cy))
+
+        self.entries[id(item)] = (item, rect, keys, self.inserted)
+        self.inserted += 1
+
+    def remove(self, item):
+        """
+        Removes an item from the grid.
+        :return: True if the item was in the grid
+        """
+        entry = self.entries.pop(id(item), None)
+        if not entry:
+            return False
+
+        for key in entry[2]:
+            cell = self.cells[key]
+            for i in range(len(cell)):
+                if cell[i] is item:
+                    # swap-remove, the order within a cell doesn't matter
+                    cell[i] = cell[-1]
+                    cell.pop()
+                    break
+            if not cell:
+                del self.cells[key]
+
+        return True
+
+    def rect(self, item):
+        return self.entries[id(item)][1]
+
+    def query_rect(self, rect):
+        """
+        Returns every item whose rect overlaps the given rect of (x, y, width, height), each item at most once and in insertion order.
+        """
+        x0, y0, x1, y1 = self.cell_range(rect)
+        found = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for item in self.cells.get((cx, cy), ()):
+                    found[id(item)] = item
+
+        matches = []
+        for item_id, item in found.items():
+            item_rect = self.entries[item_id][1]
+            if item_rect[0] < rect[0] + rect[2] and rect[0] < item_rect[0] + item_rect[2] and item_rect[1] < rect[1] + rect[3] and rect[1] < item_rect[1] + item_rect[3]:
+                matches.append(item)
+
+        if len(matches) > 1:
+            matches.sort(key=lambda item: self.entries[id(item)][3])
+
+        return matches
+
+    def query_point(self, pos):
+        """
+        Returns every item whose rect contains the given point.
+        """
+        matches = []
+        for item in self.cells.get((math.floor(pos[0] / self.cell_size), math.floor(pos[1] / self.cell_size)), ()):
+            rect = self.entries[id(item)][1]
+            if rect[0] <= pos[0] < rect[0] + rect[2] and rect[1] <= pos[1] < rect[1] + rect[3]:
+                matches.append(item)
+
+        return matches
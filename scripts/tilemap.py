@@ -1,7 +1,14 @@
 import json
+import math
+import os
 
+import numpy as np
 import pygame
 
+from scripts.spatial import SpatialGrid
+from scripts.collision import merge_runs
+from scripts import mapformat
+
 AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, 1)])): 0,
     tuple(sorted([(1, 0), (0, 1), (-1, 0)])): 1,
@@ -14,17 +21,211 @@ AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (-1, 0), (0, 1), (0, -1)])): 8,
 }
 
+# a tile's neighbors of the same type as bits, AUTOTILE_VARIANTS[bits] is the variant AUTOTILE_MAP gives them or -1 when there is none
+AUTOTILE_BITS = {(1, 0): 1, (-1, 0): 2, (0, -1): 4, (0, 1): 8}
+AUTOTILE_VARIANTS = np.full(16, -1, dtype=np.int16)
+for neighbors, variant in AUTOTILE_MAP.items():
+    AUTOTILE_VARIANTS[sum(AUTOTILE_BITS[shift] for shift in neighbors)] = variant
+
 NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
 PHYSICS_TILES = {'grass', 'stone'}
 AUTO_TILES = {'grass', 'stone'}
 
+# chunks are CHUNK_SIZE x CHUNK_SIZE tiles, CHUNK_SIZE must be a power of two so lookups can use shifts and masks
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+
+
+class TileChunk:
+    def __init__(self, types=None, variants=None, count=0):
+        """
+        :param types: the cells' type ids, any writable buffer of CHUNK_SIZE * CHUNK_SIZE bytes (e.g. a view into a memory-mapped binary
+            map), a new empty chunk is made when not given
+        """
+        # type id 0 means the cell is empty, the ids are resolved through Tilemap.tile_types
+        self.types = types if types is not None else bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        self.variants = variants if variants is not None else bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        self.count = count
+
 
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {}
+        self.chunks = {}
+
+        # offgrid tiles keyed by id() to keep their order while allowing O(1) removal, plus a spatial index over their image rects
+        self.offgrid = {}
+        self.offgrid_index = SpatialGrid(cell_size=tile_size * 4)
+
+        self.tile_types = [None]
+        self.tile_type_ids = {}
+        self.solid_types = bytearray(1)
+
+        # pre-rendered chunk surfaces, rebaked lazily when a chunk is marked dirty by an edit
+        self.render_cache = {}
+        self.dirty_chunks = set()
+
+        # solid tiles merged into larger (x, y, width, height) pixel rects for collisions, rebuilt lazily after the solids are edited
+        self.solid_spans = SpatialGrid(cell_size=tile_size * 4)
+        self.spans_dirty = False
+
+    def type_id(self, tile_type):
+        """
+        Returns the integer id of a tile type, registering the type if it hasn't been seen before.
+        """
+        if tile_type not in self.tile_type_ids:
+            self.tile_type_ids[tile_type] = len(self.tile_types)
+            self.tile_types.append(tile_type)
+            self.solid_types.append(tile_type in PHYSICS_TILES)
+
+        return self.tile_type_ids[tile_type]
+
+    @property
+    def offgrid_tiles(self):
+        """
+        The offgrid tiles in drawing order, as a tuple: add and remove them with add_offgrid() and remove_offgrid().
+        """
+        return tuple(self.offgrid.values())
+
+    @offgrid_tiles.setter
+    def offgrid_tiles(self, tiles):
+        self.offgrid = {}
+        self.offgrid_index = SpatialGrid(cell_size=self.tile_size * 4)
+        for tile in tiles:
+            self.offgrid[id(tile)] = tile
+            self.offgrid_index.insert(tile, self.offgrid_rect(tile))
+
+    def clear(self):
+        self.chunks = {}
         self.offgrid_tiles = []
+        self.render_cache = {}
+        self.dirty_chunks = set()
+        self.solid_spans.clear()
+        self.spans_dirty = False
+
+    def tile_image(self, tile_type, variant):
+        images = self.game.assets.get(tile_type) if self.game else None
+        if images and variant < len(images):
+            return images[variant]
+
+    def invalidate_rect(self, rect):
+        """
+        Marks every render chunk overlapping the given pixel rect (x, y, width, height) as dirty.
+        """
+        chunk_px = self.tile_size * CHUNK_SIZE
+        for cx in range(math.floor(rect[0] / chunk_px), math.floor((rect[0] + rect[2] - 1) / chunk_px) + 1):
+            for cy in range(math.floor(rect[1] / chunk_px), math.floor((rect[1] + rect[3] - 1) / chunk_px) + 1):
+                self.dirty_chunks.add((cx, cy))
+
+    def offgrid_rect(self, tile):
+        image = self.tile_image(tile['type'], tile['variant'])
+        size = image.get_size() if image else (self.tile_size, self.tile_size)
+        return (tile['pos'][0], tile['pos'][1], size[0], size[1])
+
+    def offgrid_at(self, pos):
+        """
+        Returns the offgrid tiles whose image covers the given pixel position.
+        """
+        return self.offgrid_index.query_point(pos)
+
+    def offgrid_in(self, rect):
+        """
+        Returns the offgrid tiles whose image overlaps the given pixel rect, in drawing order.
+        """
+        return self.offgrid_index.query_rect(rect)
+
+    def invalidate_tile(self, tile_type, variant, pos, ongrid=True):
+        image = self.tile_image(tile_type, variant)
+        size = image.get_size() if image else (self.tile_size, self.tile_size)
+        if ongrid:
+            pos = (pos[0] * self.tile_size, pos[1] * self.tile_size)
+        self.invalidate_rect((math.floor(pos[0]), math.floor(pos[1]), size[0], size[1]))
+
+    def invalidate_all(self):
+        self.render_cache = {}
+        self.dirty_chunks = set()
+        for cx, cy in self.chunks:
+            # oversized tiles near a chunk edge can spill into the chunks to the right and below
+            self.dirty_chunks.update([(cx, cy), (cx + 1, cy), (cx, cy + 1), (cx + 1, cy + 1)])
+        for tile in self.offgrid.values():
+            self.invalidate_tile(tile['type'], tile['variant'], tile['pos'], ongrid=False)
+
+    def add_offgrid(self, tile):
+        self.offgrid[id(tile)] = tile
+        self.offgrid_index.insert(tile, self.offgrid_rect(tile))
+        self.invalidate_tile(tile['type'], tile['variant'], tile['pos'], ongrid=False)
+
+    def remove_offgrid(self, tile):
+        del self.offgrid[id(tile)]
+        self.offgrid_index.remove(tile)
+        self.invalidate_tile(tile['type'], tile['variant'], tile['pos'], ongrid=False)
+
+    def get_tile(self, x, y):
+        """
+        Returns the (type, variant) of the tile at the given tile coordinates, or None if the cell is empty.
+        """
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk:
+            index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            type_id = chunk.types[index]
+            if type_id:
+                return self.tile_types[type_id], chunk.variants[index]
+
+    def set_tile(self, x, y, tile_type, variant=0):
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks.get(key)
+        if not chunk:
+            chunk = self.chunks[key] = TileChunk()
+
+        index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        type_id = self.type_id(tile_type)
+        if chunk.types[index] == type_id and chunk.variants[index] == variant:
+            return
+
+        if self.solid_types[chunk.types[index]] != self.solid_types[type_id]:
+            self.spans_dirty = True
+
+        if not chunk.types[index]:
+            chunk.count += 1
+        else:
+            self.invalidate_tile(self.tile_types[chunk.types[index]], chunk.variants[index], (x, y))
+        chunk.types[index] = type_id
+        chunk.variants[index] = variant
+        self.invalidate_tile(tile_type, variant, (x, y))
+
+    def remove_tile(self, x, y):
+        """
+        Removes the tile at the given tile coordinates.
+        :return: True if there was a tile to remove
+        """
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks.get(key)
+        if chunk:
+            index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            if chunk.types[index]:
+                if self.solid_types[chunk.types[index]]:
+                    self.spans_dirty = True
+                self.invalidate_tile(self.tile_types[chunk.types[index]], chunk.variants[index], (x, y))
+                chunk.types[index] = 0
+                chunk.variants[index] = 0
+                chunk.count -= 1
+                if not chunk.count:
+                    del self.chunks[key]
+                return True
+
+        return False
+
+    def tiles(self):
+        """
+        Iterates over every on-grid tile as (x, y, type, variant) in tile coordinates.
+        """
+        for (cx, cy), chunk in list(self.chunks.items()):
+            types = chunk.types
+            for index in range(CHUNK_SIZE * CHUNK_SIZE):
+                if types[index]:
+                    yield (cx << CHUNK_SHIFT) | (index & CHUNK_MASK), (cy << CHUNK_SHIFT) | (index >> CHUNK_SHIFT), self.tile_types[types[index]], chunk.variants[index]
 
     def extract(self, id_pairs, keep=False):
         """
@@ -33,23 +234,19 @@ class Tilemap:
         """
         matches = []
 
-        for tile in self.offgrid_tiles.copy():
+        for tile in self.offgrid_tiles:
             if (tile['type'], tile['variant']) in id_pairs:
                 matches.append(tile.copy())
 
                 if not keep:
-                    self.offgrid_tiles.remove(tile)
+                    self.remove_offgrid(tile)
 
-        for location in self.tilemap:
-            tile = self.tilemap[location]
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                matches[-1]['pos'] = matches[-1]['pos'].copy()
-                matches[-1]['pos'][0] *= self.tile_size
-                matches[-1]['pos'][1] *= self.tile_size
+        for x, y, tile_type, variant in self.tiles():
+            if (tile_type, variant) in id_pairs:
+                matches.append({'type': tile_type, 'variant': variant, 'pos': [x * self.tile_size, y * self.tile_size]})
 
                 if not keep:
-                    del self.tilemap[location]
+                    self.remove_tile(x, y)
 
         return matches
 
@@ -58,9 +255,10 @@ class Tilemap:
         tile_location = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
 
         for offset in NEIGHBOR_OFFSETS:
-            check_location = str(tile_location[0] + offset[0]) + ';' + str(tile_location[1] + offset[1])
-            if check_location in self.tilemap:
-                tiles.append(self.tilemap[check_location])
+            x, y = tile_location[0] + offset[0], tile_location[1] + offset[1]
+            tile = self.get_tile(x, y)
+            if tile:
+                tiles.append({'type': tile[0], 'variant': tile[1], 'pos': [x, y]})
 
         return tiles
 
@@ -70,59 +268,247 @@ class Tilemap:
         :param pos: the position to check
         :return: the tile at the given position if it is solid, otherwise None
         """
-        tile_location = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
-        if tile_location in self.tilemap:
-            if self.tilemap[tile_location]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_location]
+        x, y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk:
+            index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            if self.solid_types[chunk.types[index]]:
+                return {'type': self.tile_types[chunk.types[index]], 'variant': chunk.variants[index], 'pos': [x, y]}
+
+    def build_spans(self):
+        self.solid_spans.clear()
+        for x, y, width, height in merge_runs([(x, y) for x, y, tile_type, variant in self.tiles() if tile_type in PHYSICS_TILES]):
+            span = (x * self.tile_size, y * self.tile_size, width * self.tile_size, height * self.tile_size)
+            self.solid_spans.insert(span, span)
+        self.spans_dirty = False
+
+    def solid_spans_in(self, rect):
+        """
+        Returns the merged solid spans (x, y, width, height) overlapping the given pixel rect, see scripts/collision.py.
+        """
+        if self.spans_dirty:
+            self.build_spans()
+
+        return self.solid_spans.query_rect(rect)
 
     def physics_rects_around(self, pos):
         rects = []
+        tile_x, tile_y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        chunks = self.chunks
+        solid_types = self.solid_types
 
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
+        for offset in NEIGHBOR_OFFSETS:
+            x, y = tile_x + offset[0], tile_y + offset[1]
+            chunk = chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+            if chunk and solid_types[chunk.types[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]]:
+                rects.append(pygame.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size))
 
         return rects
 
+    def autotile_tile(self, x, y):
+        """
+        Autotiles the tile at the given tile coordinates and its four neighbors, which are the only tiles whose variant can change when
+        a tile is placed or removed there.
+        """
+        for shift in [(0, 0)] + list(AUTOTILE_BITS):
+            tile_x, tile_y = x + shift[0], y + shift[1]
+            tile = self.get_tile(tile_x, tile_y)
+            if not tile or tile[0] not in AUTO_TILES:
+                continue
+
+            bits = 0
+            for neighbor_shift, bit in AUTOTILE_BITS.items():
+                neighbor = self.get_tile(tile_x + neighbor_shift[0], tile_y + neighbor_shift[1])
+                if neighbor and neighbor[0] == tile[0]:
+                    bits |= bit
+
+            if AUTOTILE_VARIANTS[bits] >= 0:
+                self.set_tile(tile_x, tile_y, tile[0], int(AUTOTILE_VARIANTS[bits]))
+
     def autotile(self):
-        for location in self.tilemap:
-            tile = self.tilemap[location]
-            neighbors = set()
+        """
+        Autotiles the whole map. The neighbor bits of every cell are computed at once over the chunk arrays, each chunk padded with
+        the border cells of the chunks around it.
+        """
+        keys = list(self.chunks)
+        if not keys:
+            return
 
-            for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-                check_location = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if check_location in self.tilemap:
+        cells = [np.frombuffer(self.chunks[key].types, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE) for key in keys]
+        positions = {key: i for i, key in enumerate(keys)}
 
-                    # ensure that the neighbor tile is of the same type as the current tile
-                    if self.tilemap[check_location]['type'] == tile['type']:
-                        neighbors.add(shift)
+        types = np.zeros((len(keys), CHUNK_SIZE + 2, CHUNK_SIZE + 2), dtype=np.uint8)
+        for i, (cx, cy) in enumerate(keys):
+            types[i, 1:-1, 1:-1] = cells[i]
+            if (cx - 1, cy) in positions:
+                types[i, 1:-1, 0] = cells[positions[(cx - 1, cy)]][:, -1]
+            if (cx + 1, cy) in positions:
+                types[i, 1:-1, -1] = cells[positions[(cx + 1, cy)]][:, 0]
+            if (cx, cy - 1) in positions:
+                types[i, 0, 1:-1] = cells[positions[(cx, cy - 1)]][-1]
+            if (cx, cy + 1) in positions:
+                types[i, -1, 1:-1] = cells[positions[(cx, cy + 1)]][0]
 
-            neighbors = tuple(sorted(neighbors))
+        center = types[:, 1:-1, 1:-1]
+        bits = (types[:, 1:-1, 2:] == center) * AUTOTILE_BITS[(1, 0)]
+        bits |= (types[:, 1:-1, :-2] == center) * AUTOTILE_BITS[(-1, 0)]
+        bits |= (types[:, :-2, 1:-1] == center) * AUTOTILE_BITS[(0, -1)]
+        bits |= (types[:, 2:, 1:-1] == center) * AUTOTILE_BITS[(0, 1)]
+        variants = AUTOTILE_VARIANTS[bits]
 
-            if (tile['type'] in AUTO_TILES) and (neighbors in AUTOTILE_MAP):
-                tile['variant'] = AUTOTILE_MAP[neighbors]
+        auto_types = np.array([tile_type in AUTO_TILES for tile_type in self.tile_types])
+        update = auto_types[center] & (variants >= 0)
+
+        for i in np.flatnonzero(update.any(axis=(1, 2))):
+            cx, cy = keys[i]
+            chunk_variants = np.frombuffer(self.chunks[keys[i]].variants, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)
+            changed = update[i] & (chunk_variants != variants[i])
+            if changed.any():
+                chunk_variants[changed] = variants[i][changed]
+                # variants don't change what is solid, only the render chunks need rebaking
+                self.dirty_chunks.update([(cx, cy), (cx + 1, cy), (cx, cy + 1), (cx + 1, cy + 1)])
 
     def save(self, path):
-        f = open(path, 'w')
-        json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f)
-        f.close()
+        """
+        Saves the map as JSON, or in the binary format when the path ends in mapformat.EXTENSION.
+        """
+        tilemap = {}
+        for x, y, tile_type, variant in self.tiles():
+            tilemap[str(x) + ';' + str(y)] = {'type': tile_type, 'variant': variant, 'pos': [x, y]}
+        map_data = {'tilemap': tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}
+
+        if path.endswith(mapformat.EXTENSION):
+            # written next to the old file and moved over it, a map loaded from that file is still memory-mapped and has to keep
+            # seeing the old contents
+            f = open(path + '.tmp', 'wb')
+            f.write(mapformat.encode(map_data, CHUNK_SHIFT))
+            f.close()
+            os.replace(path + '.tmp', path)
+        else:
+            f = open(path, 'w')
+            json.dump(map_data, f)
+            f.close()
 
     def load(self, path):
-        f = open(path, 'r')
-        map_data = json.load(f)
-        f.close()
+        """
+        Loads a JSON map, or a binary map when the path ends in mapformat.EXTENSION.
+        """
+        self.clear()
 
-        self.tilemap = map_data['tilemap']
-        self.tile_size = map_data['tile_size']
-        self.offgrid_tiles = map_data['offgrid']
+        if path.endswith(mapformat.EXTENSION):
+            self.load_binary(mapformat.open_map(path))
+        else:
+            f = open(path, 'r')
+            map_data = json.load(f)
+            f.close()
+
+            self.tile_size = map_data['tile_size']
+            for tile in map_data['tilemap'].values():
+                self.set_tile(int(tile['pos'][0]), int(tile['pos'][1]), tile['type'], tile['variant'])
+            self.offgrid_tiles = map_data['offgrid']
+
+        self.invalidate_all()
+        self.build_spans()
+
+    def load_binary(self, binary_map):
+        self.tile_size = binary_map.tile_size
+
+        if binary_map.chunk_shift != CHUNK_SHIFT:
+            for tile in binary_map.to_json()['tilemap'].values():
+                self.set_tile(tile['pos'][0], tile['pos'][1], tile['type'], tile['variant'])
+        else:
+            # the chunks keep using the mapped cells unless the map's type ids have to be renumbered to this tilemap's
+            type_ids = [0] + [self.type_id(tile_type) for tile_type in binary_map.tile_types[1:]]
+            renumber = type_ids != list(range(len(type_ids)))
+            table = bytes(type_ids + [0] * (256 - len(type_ids)))
+            for cx, cy, count, types, variants in binary_map.chunks:
+                if renumber:
+                    types = bytearray(bytes(types).translate(table))
+                self.chunks[(cx, cy)] = TileChunk(types, variants, count)
+
+        self.offgrid_tiles = binary_map.offgrid
+
+    def bake_chunk(self, key):
+        """
+        Pre-renders the offgrid and on-grid tiles overlapping a chunk into a single surface.
+        """
+        chunk_px = self.tile_size * CHUNK_SIZE
+        origin = (key[0] * chunk_px, key[1] * chunk_px)
+        chunk_rect = pygame.Rect(origin, (chunk_px, chunk_px))
+        blits = []
+
+        for tile in self.offgrid_in(chunk_rect):
+            image = self.tile_image(tile['type'], tile['variant'])
+            if image:
+                blits.append((image, (math.floor(tile['pos'][0]) - origin[0], math.floor(tile['pos'][1]) - origin[1])))
+
+        # tiles larger than a grid cell can spill over from the chunks to the left and above
+        grid_tiles = []
+        for cx, cy in [(key[0] - 1, key[1] - 1), (key[0] - 1, key[1]), (key[0], key[1] - 1), key]:
+            chunk = self.chunks.get((cx, cy))
+            if not chunk:
+                continue
+            for index in range(CHUNK_SIZE * CHUNK_SIZE):
+                if chunk.types[index]:
+                    x = (cx << CHUNK_SHIFT) | (index & CHUNK_MASK)
+                    y = (cy << CHUNK_SHIFT) | (index >> CHUNK_SHIFT)
+                    image = self.tile_image(self.tile_types[chunk.types[index]], chunk.variants[index])
+                    if image and ((cx, cy) == key or chunk_rect.colliderect((x * self.tile_size, y * self.tile_size, image.get_width(), image.get_height()))):
+                        grid_tiles.append((x, y, image))
+
+        grid_tiles.sort(key=lambda tile: (tile[0], tile[1]))
+        for x, y, image in grid_tiles:
+            blits.append((image, (x * self.tile_size - origin[0], y * self.tile_size - origin[1])))
+
+        if blits:
+            surface = pygame.Surface((chunk_px, chunk_px), pygame.SRCALPHA)
+            surface.blits(blits, doreturn=False)
+            self.render_cache[key] = surface
+        else:
+            self.render_cache.pop(key, None)
+
+        self.dirty_chunks.discard(key)
+
+    def bake(self):
+        for key in list(self.dirty_chunks):
+            self.bake_chunk(key)
+
+    def stream(self, rect, budget=2, keep_distance=2):
+        """
+        Bakes the dirty chunks overlapping a pixel rect ahead of time, a few per call and nearest to the middle of the rect first, and
+        frees the baked chunks that are far away so the memory used by large maps depends on the view instead of the map size.
+        :param rect: the (x, y, width, height) to keep baked, usually the view grown by a margin in every direction
+        :param budget: the most chunks to bake in one call
+        :param keep_distance: chunks this many chunks or more outside the rect are freed (and rebaked when they come back)
+        """
+        chunk_px = self.tile_size * CHUNK_SIZE
+        x0, y0 = rect[0] // chunk_px, rect[1] // chunk_px
+        x1, y1 = (rect[0] + rect[2]) // chunk_px, (rect[1] + rect[3]) // chunk_px
+
+        for key in list(self.render_cache):
+            if key[0] < x0 - keep_distance or key[0] > x1 + keep_distance or key[1] < y0 - keep_distance or key[1] > y1 + keep_distance:
+                del self.render_cache[key]
+                self.dirty_chunks.add(key)
+
+        if not budget:
+            return
+
+        center = ((x0 + x1) / 2, (y0 + y1) / 2)
+        wanted = [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1) if (cx, cy) in self.dirty_chunks]
+        wanted.sort(key=lambda key: (key[0] - center[0]) ** 2 + (key[1] - center[1]) ** 2)
+        for key in wanted[:budget]:
+            self.bake_chunk(key)
 
     def render(self, surface, offset=(0, 0)):
-        for tile in self.offgrid_tiles:
-            surface.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
-
-        for x in range(offset[0] // self.tile_size, (offset[0] + surface.get_width()) // self.tile_size + 1):
-            for y in range(offset[1] // self.tile_size, (offset[1] + surface.get_height()) // self.tile_size + 1):
-                location = str(x) + ';' + str(y)
-                if location in self.tilemap:
-                    tile = self.tilemap[location]
-                    surface.blit(self.game.assets[tile['type']][tile['variant']], (x * self.tile_size - offset[0], y * self.tile_size - offset[1]))
+        chunk_px = self.tile_size * CHUNK_SIZE
+        blits = []
+
+        for cx in range(offset[0] // chunk_px, (offset[0] + surface.get_width()) // chunk_px + 1):
+            for cy in range(offset[1] // chunk_px, (offset[1] + surface.get_height()) // chunk_px + 1):
+                key = (cx, cy)
+                if key in self.dirty_chunks:
+                    self.bake_chunk(key)
+                if key in self.render_cache:
+                    blits.append((self.render_cache[key], (cx * chunk_px - offset[0], cy * chunk_px - offset[1])))
+
+        surface.blits(blits, doreturn=False)
@@ -0,0 +1,81 @@
+import pygame
+
+TRANSITION_STYLES = {'iris', 'fade', 'wipe'}
+# the iris radius shrinks by this many pixels per step
+IRIS_SPEED = 8
+
+
+class TransitionRenderer:
+    """
+    Covers the screen between levels and after deaths. Transitions run while a level is loading, so nothing is allocated per frame.
+
+    Styles:
+        'iris' - a black screen with a shrinking circular hole in the middle (the original); the part of every step's mask that isn't
+                 solid black is drawn once and cached by radius, the rest is plain fills
+        'fade' - fades to black through one reused surface
+        'wipe' - a black band sweeping down from the top, only fills
+    """
+    def __init__(self, size, style='iris', length=30):
+        """
+        :param size: the size of the surface the transition is drawn on
+        :param length: the number of steps from an open to a fully covered screen
+        """
+        if style not in TRANSITION_STYLES:
+            raise ValueError('unknown transition style: ' + str(style))
+
+        self.size = size
+        self.style = style
+        self.length = length
+
+        # radius -> (the mask's bounding square clipped to the screen, with the hole as the colorkey, and where it goes)
+        self.iris_cache = {}
+
+        if style == 'fade':
+            self.fade = pygame.Surface(size)
+
+    def iris_mask(self, radius):
+        if radius not in self.iris_cache:
+            center = (self.size[0] // 2, self.size[1] // 2)
+            rect = pygame.Rect(center[0] - radius, center[1] - radius, radius * 2, radius * 2).clip((0, 0) + tuple(self.size))
+
+            mask = pygame.Surface(rect.size)
+            pygame.draw.circle(mask, (255, 255, 255), (center[0] - rect.x, center[1] - rect.y), radius)
+            mask.set_colorkey((255, 255, 255))
+            self.iris_cache[radius] = (mask, rect)
+
+        return self.iris_cache[radius]
+
+    def render(self, surface, progress):
+        """
+        :param progress: how far the screen is covered, from 0 (open) to length (fully covered)
+        """
+        progress = min(max(progress, 0), self.length)
+        if not progress:
+            return
+
+        if self.style == 'fade':
+            self.fade.set_alpha(255 * progress // self.length)
+            surface.blit(self.fade, (0, 0))
+            return
+
+        if self.style == 'wipe':
+            surface.fill((0, 0, 0), (0, 0, self.size[0], self.size[1] * progress // self.length))
+            return
+
+        radius = (self.length - progress) * IRIS_SPEED
+        if radius * radius * 4 >= self.size[0] * self.size[0] + self.size[1] * self.size[1]:
+            # the hole covers the whole screen
+            return
+        if radius <= 0:
+            surface.fill((0, 0, 0))
+            return
+
+        mask, rect = self.iris_mask(radius)
+        surface.blit(mask, rect)
+
+        # everything outside the mask's square is covered
+        width, height = self.size
+        surface.fill((0, 0, 0), (0, 0, width, rect.top))
+        surface.fill((0, 0, 0), (0, rect.bottom, width, height - rect.bottom))
+        surface.fill((0, 0, 0), (0, rect.top, rect.left, rect.height))
+        surface.fill((0, 0, 0), (rect.right, rect.top, width - rect.right, rect.height))
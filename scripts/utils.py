@@ -12,6 +12,23 @@ def load_image(path):
     return img
 
 
+class NullSound:
+    """
+    Stands in for pygame.mixer.Sound when running without audio.
+    """
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def fadeout(self, time):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+
 def load_images(path):
     images = []
     for image_name in sorted(os.listdir(BASE_IMG_PATH + path)):
@@ -20,26 +37,86 @@ def load_images(path):
     return images
 
 
-class Animation:
-    def __init__(self, images, image_duration=5, loop=True):
-        self.images = images
+class SpriteAtlas:
+    """
+    Packs a list of frames into one surface holding every frame next to its horizontally flipped copy, and hands out subsurfaces of it
+    so nothing has to be flipped while rendering.
+    """
+    def __init__(self, images):
+        width = sum(image.get_width() for image in images)
+        height = max(image.get_height() for image in images)
+
+        self.surface = pygame.Surface((width, height * 2))
+        self.surface.set_colorkey((0, 0, 0))
+
+        self.frames = []
+        self.flipped = []
+        x = 0
+        for image in images:
+            size = image.get_size()
+            self.surface.blit(image, (x, 0))
+            self.surface.blit(pygame.transform.flip(image, True, False), (x, height))
+            self.frames.append(self.surface.subsurface((x, 0), size))
+            self.flipped.append(self.surface.subsurface((x, height), size))
+            x += size[0]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def image(self, index, flip=False):
+        """
+        Returns a cached frame.
+        """
+        return (self.flipped if flip else self.frames)[index]
+
+
+class AnimationClip:
+    """
+    The shared part of an animation: its frames and timing, with the image shown on every tick precomputed. Clips are never changed
+    while playing, every entity or particle plays one through its own Playhead.
+    """
+    def __init__(self, images, image_duration=5, loop=True, atlas=None):
+        self.atlas = atlas if atlas else SpriteAtlas(images)
+        self.images = self.atlas.frames
         self.image_duration = image_duration
         self.loop = loop
 
-        self.done = False
-        self.frame = 0
+        # tick -> image, for both orientations
+        self.length = len(self.images) * image_duration
+        self.frames = [self.atlas.frames[tick // image_duration] for tick in range(self.length)]
+        self.flipped = [self.atlas.flipped[tick // image_duration] for tick in range(self.length)]
+
+    def play(self, frame=0):
+        return Playhead(self, frame)
 
-    def copy(self):
-        return Animation(self.images, self.image_duration, self.loop)
+
+class Playhead:
+    """
+    Where one entity or particle is in an AnimationClip, a few bytes per instance.
+    """
+    __slots__ = ('clip', 'frame', 'done')
+
+    def __init__(self, clip, frame=0):
+        self.start(clip, frame)
+
+    def start(self, clip, frame=0):
+        """
+        Plays a clip from the given tick, reusing this playhead.
+        """
+        self.clip = clip
+        self.frame = frame
+        self.done = False
 
     def update(self):
-        if self.loop:
-            self.frame = (self.frame + 1) % (len(self.images) * self.image_duration)
+        if self.clip.loop:
+            self.frame += 1
+            if self.frame >= self.clip.length:
+                self.frame = 0
         else:
-            self.frame = min(self.frame + 1, len(self.images) * self.image_duration - 1)
+            self.frame = min(self.frame + 1, self.clip.length - 1)
 
-            if self.frame >= len(self.images) * self.image_duration - 1:
+            if self.frame >= self.clip.length - 1:
                 self.done = True
 
-    def image(self):
-        return self.images[int(self.frame / self.image_duration)]
+    def image(self, flip=False):
+        return (self.clip.flipped if flip else self.clip.frames)[self.frame]